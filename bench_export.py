@@ -0,0 +1,85 @@
+"""
+Benchmark: conversation import/export throughput on a large checkpoint database.
+
+Seeds a fresh SQLite checkpoint DB through the bulk import path, then exports it
+to NDJSON and Parquet, reporting messages/s and the process's peak RSS.
+
+Usage:
+    python bench_export.py --threads 20000 --messages 50     # 1M messages
+"""
+
+import argparse
+import os
+import resource
+import sqlite3
+import tempfile
+import time
+
+from langchain_core.messages import AIMessage, HumanMessage, messages_to_dict
+from langgraph.checkpoint.sqlite import SqliteSaver
+
+from conversation_export import import_conversations, iter_conversations, write_ndjson, write_parquet
+from langgraph_tool_backend import build_graph
+
+def peak_rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def make_records(threads: int, messages: int):
+    for t in range(threads):
+        thread_messages = [
+            (HumanMessage if i % 2 == 0 else AIMessage)(
+                content=f"Message {i} in thread {t}: a table for four this Saturday evening, please.",
+                id=f"{t}-{i}"
+            )
+            for i in range(messages)
+        ]
+        yield {
+            "thread_id": f"bench-{t:08d}",
+            "messages": messages_to_dict(thread_messages),
+            "booking_history": [{"party_size": "4", "date": "Saturday", "confirmed_at": "2025-11-02 12:00:00"}],
+        }
+
+def report(label: str, total_messages: int, elapsed: float):
+    print(f"{label:<16} {elapsed:8.2f}s  {total_messages / elapsed:12,.0f} messages/s  peak RSS {peak_rss_mb():8.1f} MB")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--threads", type=int, default=20000)
+    parser.add_argument("--messages", type=int, default=50, help="messages per thread")
+    parser.add_argument("--workdir", default=tempfile.gettempdir())
+    args = parser.parse_args()
+
+    db_path = os.path.join(args.workdir, "bench_export.db")
+    ndjson_path = os.path.join(args.workdir, "bench_export.ndjson")
+    parquet_path = os.path.join(args.workdir, "bench_export.parquet")
+    if os.path.exists(db_path):
+        os.remove(db_path)
+
+    total_messages = args.threads * args.messages
+    print(f"threads={args.threads} messages/thread={args.messages} total={total_messages:,}")
+
+    conn = sqlite3.connect(db_path, check_same_thread=False)
+    chatbot = build_graph(SqliteSaver(conn=conn))
+    start = time.perf_counter()
+    import_conversations(chatbot, make_records(args.threads, args.messages))
+    report("import", total_messages, time.perf_counter() - start)
+    conn.close()
+    print(f"db size: {os.path.getsize(db_path) / 1024 / 1024:.1f} MB")
+
+    start = time.perf_counter()
+    with open(ndjson_path, "w", encoding="utf-8") as fp:
+        write_ndjson(iter_conversations(db_path), fp)
+    report("export ndjson", total_messages, time.perf_counter() - start)
+
+    start = time.perf_counter()
+    write_parquet(iter_conversations(db_path), parquet_path)
+    report("export parquet", total_messages, time.perf_counter() - start)
+
+    print(f"ndjson: {os.path.getsize(ndjson_path) / 1024 / 1024:.1f} MB  "
+          f"parquet: {os.path.getsize(parquet_path) / 1024 / 1024:.1f} MB")
+
+    for path in (db_path, ndjson_path, parquet_path):
+        os.remove(path)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Benchmark: cost of the output guardrail on streamed responses.
+
+1. Per token: feeds a long tokenized answer through the stream redactor and
+   compares it with passing tokens straight through; also reports how many
+   characters are held back on average while waiting for a word to complete.
+2. Time to first token: streams turns through the compiled graph (fake LLM,
+   in-memory checkpointer) with the guardrail on and off, the way
+   /chat/stream consumes them.
+
+Usage:
+    python bench_guardrail.py --tokens 200000 --turns 300
+"""
+
+import argparse
+import os
+import statistics
+import time
+import uuid
+
+os.environ.setdefault("LLM_PROVIDER", "fake")
+
+from langchain_core.messages import AIMessage, HumanMessage
+from langgraph.checkpoint.memory import InMemorySaver
+
+from langgraph_tool_backend import build_graph, output_guard
+
+SAMPLE = (
+    "Sure, here is what I found. The assessment of the hellish schedule was damn hard, "
+    "but the class passed. Hello to everyone who asked about Saturday; the shell script "
+    "is done and nobody should call anyone an idiot for it. "
+)
+
+def tokenize(text: str, count: int) -> list[str]:
+    """Roughly BPE-sized tokens: words with their leading space, long words split."""
+    tokens = []
+    while len(tokens) < count:
+        for word in text.split(" "):
+            word = " " + word
+            tokens += [word[i:i + 4] for i in range(0, len(word), 4)]
+    return tokens[:count]
+
+def per_token(count: int):
+    tokens = tokenize(SAMPLE, count)
+
+    start = time.perf_counter()
+    for token in tokens:
+        if token:
+            pass
+    baseline = time.perf_counter() - start
+
+    redactor = output_guard.stream()
+    held = 0
+    start = time.perf_counter()
+    for token in tokens:
+        redactor.feed(token, "bench")
+        held += len(redactor.pending)
+    redactor.flush()
+    guarded = time.perf_counter() - start
+
+    print(f"tokens:           {count}")
+    print(f"per-token cost:   {(guarded - baseline) / count * 1e6:.2f} µs added")
+    print(f"held back:        {held / count:.2f} chars on average")
+
+def first_token_ms(chatbot, message: str) -> float:
+    config = {'configurable': {'thread_id': str(uuid.uuid4())}}
+    redactor = output_guard.stream()
+    start = time.perf_counter()
+    first = None
+    for message_chunk, metadata in chatbot.stream(
+        {"messages": [HumanMessage(content=message)]}, config=config, stream_mode="messages"
+    ):
+        if isinstance(message_chunk, AIMessage) and redactor.feed(message_chunk.content, message_chunk.id) and first is None:
+            first = time.perf_counter() - start
+    redactor.flush()
+    return first * 1000
+
+def time_to_first_token(turns: int):
+    chatbot = build_graph(InMemorySaver())
+    message = "tell me about the weather on the coast today"
+    results = {}
+    for enabled in (False, True, False, True):
+        output_guard.enabled = enabled
+        first_token_ms(chatbot, message)  # warm up
+        results.setdefault(enabled, []).extend(first_token_ms(chatbot, message) for _ in range(turns))
+    output_guard.enabled = True
+
+    for enabled, label in ((False, "guardrail off"), (True, "guardrail on")):
+        latencies = sorted(results[enabled])
+        print(f"TTFT {label:<14} p50 {statistics.median(latencies):.3f} ms  "
+              f"p95 {latencies[int(len(latencies) * 0.95) - 1]:.3f} ms")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tokens", type=int, default=200000)
+    parser.add_argument("--turns", type=int, default=300)
+    args = parser.parse_args()
+
+    per_token(args.tokens)
+    time_to_first_token(args.turns)
+
+if __name__ == "__main__":
+    main()
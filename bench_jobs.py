@@ -0,0 +1,89 @@
+"""
+Benchmark: request latency of the booking confirmation turn with the
+confirmation delivered by a job worker vs inline, plus raw enqueue cost.
+
+A local webhook stands in for the email service (--webhook-ms delay). Each
+booking runs the full /chat path in-process (fake LLM); only the final "yes"
+turn is timed, since that is the one that triggers the confirmation.
+
+Usage:
+    python bench_jobs.py --bookings 30 --webhook-ms 200
+    python bench_jobs.py --bookings 30 --webhook-ms 200 --inline
+"""
+
+import argparse
+import os
+import statistics
+import tempfile
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+def start_webhook(delay_ms: float) -> str:
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get("content-length", 0)))
+            time.sleep(delay_ms / 1000)
+            self.send_response(204)
+            self.end_headers()
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{server.server_port}/confirm"
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--bookings", type=int, default=30)
+    parser.add_argument("--webhook-ms", type=float, default=200)
+    parser.add_argument("--enqueues", type=int, default=2000)
+    parser.add_argument("--inline", action="store_true", help="send confirmations inside the request")
+    args = parser.parse_args()
+
+    os.environ.setdefault("LLM_PROVIDER", "fake")
+    os.environ["BOOKING_CONFIRMATION_URL"] = start_webhook(args.webhook_ms)
+    os.chdir(tempfile.mkdtemp())  # keeps the benchmark's databases out of the repo
+
+    from fastapi.testclient import TestClient
+    import main as server
+    from jobs import job_queue
+
+    if args.inline:
+        job_queue.enqueue = lambda kind, payload, **kwargs: job_queue.handlers[kind](payload)
+
+    latencies = []
+    with TestClient(server.app) as client:
+        for _ in range(args.bookings):
+            thread_id = str(uuid.uuid4())
+            for message in ["I want to book a table", "friday", "4"]:
+                client.post("/chat", json={"message": message, "thread_id": thread_id})
+            start = time.perf_counter()
+            client.post("/chat", json={"message": "yes", "thread_id": thread_id})
+            latencies.append((time.perf_counter() - start) * 1000)
+
+        drain_start = time.perf_counter()
+        job_queue.drain()
+        drained_ms = (time.perf_counter() - drain_start) * 1000
+        stats = job_queue.stats()
+
+        job_queue.handler("bench_noop")(lambda payload: None)
+        enqueue_start = time.perf_counter()
+        for i in range(args.enqueues):
+            job_queue.enqueue("bench_noop", {"i": i})
+        enqueue_us = (time.perf_counter() - enqueue_start) / args.enqueues * 1e6
+        job_queue.drain()
+
+    latencies.sort()
+    print(f"confirmations: {'inline' if args.inline else 'job queue'}, webhook {args.webhook_ms:.0f} ms")
+    print(f"confirm turn ms p50:  {statistics.median(latencies):.1f}")
+    print(f"confirm turn ms p95:  {latencies[max(0, int(len(latencies) * 0.95) - 1)]:.1f}")
+    if not args.inline:
+        print(f"queue drained after:  {drained_ms:.0f} ms (completed {stats['completed']}, dead {stats['dead']})")
+        print(f"job wait ms p50/p95:  {stats['wait_ms_p50']} / {stats['wait_ms_p95']}")
+        print(f"enqueue cost:         {enqueue_us:.1f} µs")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Benchmark: memory per /chat request for large and adversarial inputs.
+
+Posts each input through the full /chat path in-process (middleware, JSON
+parsing, validation, graph, checkpointing; fake LLM) and reports the
+tracemalloc peak and latency per request. Run it with and without the
+limits to see what they save:
+
+Usage:
+    python bench_memory.py --requests 5
+    python bench_memory.py --requests 5 --no-limits
+"""
+
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import time
+import tracemalloc
+import uuid
+
+def cases(max_chars: int) -> dict:
+    words = " ".join(f"word{i}" for i in range(max_chars // 8))
+    return {
+        "small question": json.dumps({"message": "What is the capital of France?"}),
+        "at message limit": json.dumps({"message": words[:max_chars]}),
+        "over message limit": json.dumps({"message": "hello " * (max_chars // 5)}),
+        "1 MB message": json.dumps({"message": "hello " * 175_000}),
+        "8 MB message": json.dumps({"message": "x" * 8_000_000}),
+        "escaped unicode": json.dumps({"message": "é" * 10_000}),  # 6 body bytes per char
+        "lower() expansion": json.dumps({"message": "İ" * 7_000}, ensure_ascii=False),
+        "many short words": json.dumps({"message": "a " * 3_999}),
+        "or/maybe chain": json.dumps({"message": "book a table " + "saturday or maybe " * 400}),
+        "deep JSON nesting": '{"message": "hi", "x": ' + "[" * 20_000 + "]" * 20_000 + "}",
+    }
+
+def run_case(client, body: str, requests: int) -> tuple[list, list, set]:
+    peaks, latencies, statuses = [], [], set()
+    for _ in range(requests):
+        # Encoded up front, so the client's copy of the body is not counted
+        payload = body.replace('{"message"', f'{{"thread_id": "{uuid.uuid4()}", "message"', 1).encode()
+        tracemalloc.reset_peak()
+        base = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter()
+        response = client.post("/chat", content=payload, headers={"content-type": "application/json"})
+        latencies.append((time.perf_counter() - start) * 1000)
+        peaks.append(tracemalloc.get_traced_memory()[1] - base)
+        statuses.add(response.status_code)
+        del response, payload
+    return peaks, latencies, statuses
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=5)
+    parser.add_argument("--no-limits", action="store_true", help="disable body and message size limits")
+    args = parser.parse_args()
+
+    os.environ.setdefault("LLM_PROVIDER", "fake")
+    if args.no_limits:
+        os.environ["MAX_BODY_BYTES"] = "0"
+        os.environ["MAX_MESSAGE_CHARS"] = str(10 ** 9)
+    os.chdir(tempfile.mkdtemp())  # keeps the benchmark's checkpoint DB out of the repo
+
+    from fastapi.testclient import TestClient
+    import main as server
+
+    tracemalloc.start()
+    with TestClient(server.app) as client:
+        run_case(client, cases(8000)["small question"], 2)  # warm up
+        print(f"limits: {'off' if args.no_limits else 'on'}")
+        print(f"{'input':<20} {'body KB':>9} {'status':>8} {'peak KB p50':>12} {'peak KB max':>12} {'ms p50':>9}")
+        for name, body in cases(8000).items():
+            peaks, latencies, statuses = run_case(client, body, args.requests)
+            print(f"{name:<20} {len(body.encode()) / 1024:>9.1f} {','.join(map(str, sorted(statuses))):>8} "
+                  f"{statistics.median(peaks) / 1024:>12.1f} {max(peaks) / 1024:>12.1f} {statistics.median(latencies):>9.1f}")
+    tracemalloc.stop()
+
+if __name__ == "__main__":
+    main()
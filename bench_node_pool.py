@@ -0,0 +1,78 @@
+"""
+Benchmark: single-process vs pooled execution of the rule-based graph nodes.
+
+Drives full booking conversations (plus a knowledge base question) through the
+compiled graph from many threads, the way uvicorn's threadpool would, using an
+in-memory checkpointer and no LLM calls. Long messages make the rule-based work
+dominate, which is the case the node pool is meant for.
+
+Usage:
+    python bench_node_pool.py --workers 4 --threads 16 --conversations 200 --padding 400
+"""
+
+import argparse
+import os
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from langchain_core.messages import HumanMessage
+from langgraph.checkpoint.memory import InMemorySaver
+
+import node_pool
+from langgraph_tool_backend import build_graph
+
+TURNS = [
+    "I'd like to book a table this weekend",
+    "Saturday",
+    "4",
+    "yes",
+    "what is the capital of france",
+]
+
+def make_turns(padding: int) -> list[str]:
+    """Pad each turn with distinct filler words so the validators have real text to scan."""
+    filler = " ".join(f"item{i}" for i in range(padding))
+    return [f"{turn} {filler}" if padding else turn for turn in TURNS]
+
+def run_conversation(chatbot, turns: list[str]):
+    config = {'configurable': {'thread_id': str(uuid.uuid4())}}
+    for turn in turns:
+        chatbot.invoke({"messages": [HumanMessage(content=turn)]}, config=config)
+
+def run(label: str, threads: int, conversations: int, turns: list[str]) -> float:
+    chatbot = build_graph(InMemorySaver())
+    run_conversation(chatbot, turns)  # warm up
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        list(executor.map(lambda _: run_conversation(chatbot, turns), range(conversations)))
+    elapsed = time.perf_counter() - start
+
+    total_turns = conversations * len(turns)
+    print(f"{label:<16} {total_turns:>7} turns  {elapsed:8.2f}s  {total_turns / elapsed:9.1f} turns/s")
+    return total_turns / elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2)
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--conversations", type=int, default=200)
+    parser.add_argument("--padding", type=int, default=400, help="filler words appended to each turn")
+    args = parser.parse_args()
+
+    turns = make_turns(args.padding)
+    print(f"cpus={os.cpu_count()} workers={args.workers} threads={args.threads} padding={args.padding}")
+
+    single = run("single-process", args.threads, args.conversations, turns)
+
+    node_pool.start_pool(args.workers)
+    try:
+        pooled = run(f"pooled x{args.workers}", args.threads, args.conversations, turns)
+    finally:
+        node_pool.shutdown_pool()
+
+    print(f"speedup: {pooled / single:.2f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Benchmark: bytes and requests per UI page view, and the cost of compressing
+the history endpoint.
+
+Page views are replayed the way a browser would: a first visit fetches the
+page and its assets, a repeat visit revalidates the page (304) and takes the
+content-hashed assets from its cache. A long thread is then fetched from
+/thread/{id}/history with and without Accept-Encoding (fake LLM, in-process).
+
+Usage:
+    python bench_static.py --messages 200 --requests 50
+"""
+
+import argparse
+import os
+import re
+import statistics
+import tempfile
+import time
+import uuid
+
+def timed_get(client, url: str, headers: dict, requests: int) -> tuple[float, int, int]:
+    latencies = []
+    for _ in range(requests):
+        start = time.perf_counter()
+        response = client.get(url, headers=headers)
+        latencies.append((time.perf_counter() - start) * 1000)
+    wire = int(response.headers.get("content-length", len(response.content)))
+    return statistics.median(latencies), wire, response.status_code
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=200, help="turns in the history thread")
+    parser.add_argument("--requests", type=int, default=50)
+    args = parser.parse_args()
+
+    os.environ.setdefault("LLM_PROVIDER", "fake")
+    os.chdir(tempfile.mkdtemp())  # keeps the benchmark's databases out of the repo
+
+    from fastapi.testclient import TestClient
+    import main as server
+
+    browser = {"accept-encoding": "gzip, deflate, br"}
+    with TestClient(server.app) as client:
+        page = client.get("/", headers=browser)
+        first_bytes = int(page.headers["content-length"])
+        assets = re.findall(r'/static/[^"\']+', page.text)
+        for url in assets:
+            first_bytes += int(client.get(url, headers=browser).headers["content-length"])
+        identity_bytes = len(client.get("/", headers={"accept-encoding": "identity"}).content) + sum(
+            len(client.get(url, headers={"accept-encoding": "identity"}).content) for url in assets)
+        repeat = client.get("/", headers={**browser, "if-none-match": page.headers["etag"]})
+
+        print(f"{'page view':<28} {'requests':>9} {'bytes':>9}")
+        print(f"{'first, uncompressed':<28} {1 + len(assets):>9} {identity_bytes:>9}")
+        print(f"{'first, compressed':<28} {1 + len(assets):>9} {first_bytes:>9}")
+        print(f"{'repeat (304, cached assets)':<28} {1:>9} {len(repeat.content):>9}  status {repeat.status_code}")
+
+        thread_id = str(uuid.uuid4())
+        for i in range(args.messages):
+            client.post("/chat", json={"message": f"Tell me something about topic number {i}, please.", "thread_id": thread_id})
+        url = f"/thread/{thread_id}/history"
+
+        print(f"\n{'history, ' + str(args.messages * 2) + ' messages':<28} {'ms p50':>9} {'bytes':>9}")
+        for label, headers in [("identity", {"accept-encoding": "identity"}), ("compressed", browser)]:
+            ms, wire, _ = timed_get(client, url, headers, args.requests)
+            print(f"{label:<28} {ms:>9.2f} {wire:>9}")
+        etag = client.get(url, headers=browser).headers["etag"]
+        ms, wire, status = timed_get(client, url, {**browser, "if-none-match": etag}, args.requests)
+        print(f"{'revalidated (' + str(status) + ')':<28} {ms:>9.2f} {wire:>9}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Benchmark: open WebSockets per worker.
+
+Starts one uvicorn worker, opens N concurrent /ws connections, reports the
+server's RSS per open socket, then sends one knowledge base question on every
+socket at once (no LLM call) and reports turn latency and throughput.
+
+Usage:
+    python bench_websocket.py --sockets 1000
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import websockets
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def rss_mb(pid: int) -> float:
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+async def wait_for_server(url: str, timeout: float = 30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            async with websockets.connect(url):
+                return
+        except OSError:
+            await asyncio.sleep(0.2)
+    raise RuntimeError("server did not start")
+
+async def turn(ws, thread_id: str) -> float:
+    start = time.perf_counter()
+    await ws.send(json.dumps({"type": "chat", "thread_id": thread_id, "message": "What is the capital of France?"}))
+    while True:
+        data = json.loads(await ws.recv())
+        if data.get("thread_id") == thread_id and data["type"] in ("end", "error", "cancelled"):
+            return (time.perf_counter() - start) * 1000
+
+async def run(url: str, pid: int, sockets: int):
+    base_rss = rss_mb(pid)
+    connections = []
+    start = time.perf_counter()
+    for i in range(0, sockets, 100):
+        connections += await asyncio.gather(*(websockets.connect(url, max_queue=None) for _ in range(min(100, sockets - i))))
+    connect_s = time.perf_counter() - start
+    await asyncio.sleep(1)
+    open_rss = rss_mb(pid)
+
+    print(f"open sockets:   {len(connections)} in {connect_s:.2f}s")
+    print(f"server RSS:     {base_rss:.1f} MB idle -> {open_rss:.1f} MB "
+          f"({(open_rss - base_rss) * 1024 / len(connections):.1f} KB per socket)")
+
+    start = time.perf_counter()
+    latencies = await asyncio.gather(*(turn(ws, f"bench-ws-{i}") for i, ws in enumerate(connections)))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    print(f"turns:          {len(latencies)} in {elapsed:.2f}s ({len(latencies) / elapsed:.1f} turns/s)")
+    print(f"latency ms:     p50 {statistics.median(latencies):.1f}  "
+          f"p95 {latencies[int(len(latencies) * 0.95) - 1]:.1f}  max {latencies[-1]:.1f}")
+    print(f"server RSS:     {rss_mb(pid):.1f} MB after turns")
+
+    await asyncio.gather(*(ws.close() for ws in connections))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sockets", type=int, default=1000)
+    args = parser.parse_args()
+
+    port = free_port()
+    repo = os.path.dirname(os.path.abspath(__file__))
+    workdir = tempfile.mkdtemp()  # keeps the benchmark's checkpoint DB out of the repo
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=workdir,
+        env={**os.environ, "PYTHONPATH": repo, "WS_IDLE_TIMEOUT": "3600"}
+    )
+    try:
+        url = f"ws://127.0.0.1:{port}/ws"
+        asyncio.run(wait_for_server(url))
+        asyncio.run(run(url, server.pid, args.sockets))
+    finally:
+        server.terminate()
+        server.wait()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,208 @@
+"""
+Materialized per-thread booking summary, kept in graph state next to
+booking_history and updated once per confirmed booking:
+
+    {"count": 3, "total_guests": 10, "unsized": 0, "undated": 1,
+     "latest": {...booking...},
+     "by_date": {"2026-10-23": {"bookings": 1, "guests": 4}, ...},
+     "summary": "<the default booking_query_handler reply>"}
+
+Booking dates are free text ("Saturday", "tomorrow", "2026-10-23"); they are
+resolved against the day the booking was confirmed, and bookings whose date
+cannot be resolved are only counted in "undated". Queries read the index and
+never walk booking_history.
+"""
+
+import re
+from datetime import date, datetime, timedelta
+
+DAYS_OF_WEEK = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]
+MONTHS = ["january", "february", "march", "april", "may", "june", "july",
+          "august", "september", "october", "november", "december"]
+
+ISO_DATE_RE = re.compile(r"\b(\d{4})-(\d{1,2})-(\d{1,2})\b")
+MONTH_DAY_RE = re.compile(r"\b(" + "|".join(m[:3] for m in MONTHS) + r")[a-z]*\.?\s+(\d{1,2})(?:st|nd|rd|th)?\b")
+DAY_MONTH_RE = re.compile(r"\b(\d{1,2})(?:st|nd|rd|th)?\s+(?:of\s+)?(" + "|".join(m[:3] for m in MONTHS) + r")[a-z]*\b")
+NUMBER_RE = re.compile(r"\d+")
+
+GUEST_WORDS = ("guest", "people", "person", "party size", "seats")
+
+# -------------------
+# Resolving bookings
+# -------------------
+def confirmed_day(booking: dict) -> date:
+    try:
+        return datetime.strptime(booking.get("confirmed_at", ""), "%Y-%m-%d %H:%M:%S").date()
+    except ValueError:
+        return date.today()
+
+def next_weekday(start: date, weekday: int) -> date:
+    return start + timedelta(days=(weekday - start.weekday()) % 7)
+
+def month_day(start: date, month: int, day: int) -> date | None:
+    """The next such date on or after start (this year or next)."""
+    for year in (start.year, start.year + 1):
+        try:
+            candidate = date(year, month, day)
+        except ValueError:
+            return None
+        if candidate >= start:
+            return candidate
+    return None
+
+def resolve_date(text, start: date) -> date | None:
+    """Calendar date of a free-text booking date, relative to the day it was booked."""
+    if not isinstance(text, str):
+        return None
+    text = text.lower()
+    if match := ISO_DATE_RE.search(text):
+        try:
+            return date(*map(int, match.groups()))
+        except ValueError:
+            return None
+    if match := MONTH_DAY_RE.search(text):
+        return month_day(start, [m[:3] for m in MONTHS].index(match.group(1)) + 1, int(match.group(2)))
+    if match := DAY_MONTH_RE.search(text):
+        return month_day(start, [m[:3] for m in MONTHS].index(match.group(2)) + 1, int(match.group(1)))
+    if "day after tomorrow" in text:
+        return start + timedelta(days=2)
+    if "tomorrow" in text:
+        return start + timedelta(days=1)
+    if "today" in text or "tonight" in text:
+        return start
+    for weekday, name in enumerate(DAYS_OF_WEEK):
+        if name in text:
+            return next_weekday(start, weekday)
+    return None
+
+def party_size(booking: dict) -> int | None:
+    match = NUMBER_RE.search(str(booking.get("party_size", "")))
+    return int(match.group(0)) if match else None
+
+# -------------------
+# Maintaining the index
+# -------------------
+def empty_index() -> dict:
+    return {"count": 0, "total_guests": 0, "unsized": 0, "undated": 0, "latest": None, "by_date": {}, "summary": ""}
+
+def add_booking(index: dict, booking: dict) -> dict:
+    """Index with one more confirmed booking (a new dict; state values are never mutated)."""
+    guests = party_size(booking)
+    day = resolve_date(booking.get("date"), confirmed_day(booking))
+    by_date = dict(index["by_date"])
+    if day is not None:
+        key = day.isoformat()
+        entry = by_date.get(key, {"bookings": 0, "guests": 0})
+        by_date[key] = {"bookings": entry["bookings"] + 1, "guests": entry["guests"] + (guests or 0)}
+    index = {
+        **index,
+        "count": index["count"] + 1,
+        "total_guests": index["total_guests"] + (guests or 0),
+        "unsized": index["unsized"] + (guests is None),
+        "undated": index["undated"] + (day is None),
+        "latest": {**booking, "resolved_date": day.isoformat() if day else None},
+        "by_date": by_date,
+    }
+    index["summary"] = format_summary(index)
+    return index
+
+def build_index(history: list) -> dict:
+    index = empty_index()
+    for booking in history:
+        index = add_booking(index, booking)
+    return index
+
+def current_index(state: dict) -> dict:
+    """The thread's index; rebuilt from booking_history for threads indexed before (or imported)."""
+    history = state.get("booking_history") or []
+    index = state.get("booking_index")
+    if not index or index.get("count") != len(history):
+        index = build_index(history)
+    return index
+
+# -------------------
+# Answers
+# -------------------
+def plural(n: int, word: str) -> str:
+    return f"{n} {word}" + ("" if n == 1 else "s")
+
+def format_summary(index: dict) -> str:
+    latest = index["latest"]
+    count = index["count"]
+    response = f"📋 **Your Booking History**\n\n"
+    response += f"Total bookings: {count}\n\n"
+    response += f"**Most Recent Booking:**\n"
+    response += f"👥 Party Size: {latest.get('party_size', 'Not specified')} people\n"
+    response += f"📅 Date: {latest.get('date', 'Not specified')}\n"
+    response += f"🕐 Booked on: {latest.get('confirmed_at', 'N/A')}\n"
+    if count > 1:
+        response += f"\n💡 You have {count - 1} other booking(s) on record."
+    return response
+
+def query_range(message: str, today: date) -> tuple[str, date, date] | None:
+    """(label, first day, last day) of the period a booking question asks about."""
+    # Weekends before weeks: "next weekend" contains "next week", "this weekend" contains "this week"
+    if "next weekend" in message:
+        saturday = today + timedelta(days=12 - today.weekday())  # Saturday of next week
+        return "next weekend", saturday, saturday + timedelta(days=1)
+    if "weekend" in message:
+        if today.weekday() == 6:
+            return "this weekend", today, today
+        saturday = next_weekday(today, 5)
+        return "this weekend", saturday, saturday + timedelta(days=1)
+    if "next week" in message:
+        start = today + timedelta(days=7 - today.weekday())
+        return "next week", start, start + timedelta(days=6)
+    if "this week" in message:
+        return "this week", today, today + timedelta(days=6 - today.weekday())
+    if "tomorrow" in message:
+        return "tomorrow", today + timedelta(days=1), today + timedelta(days=1)
+    if "today" in message or "tonight" in message:
+        return "today", today, today
+    if any(word in message for word in ("upcoming", "coming up", "future", "next booking", "next reservation")):
+        return "coming up", today, date.max
+    return None
+
+def answer_query(index: dict, message: str, today: date | None = None) -> str:
+    """Reply to a booking question from the index alone."""
+    if not index or not index["count"]:
+        return "You haven't made any bookings yet. Would you like to book a table?"
+    today = today or date.today()
+    message = message.lower()
+    asks_guests = any(word in message for word in GUEST_WORDS)
+
+    period = query_range(message, today)
+    if period:
+        label, first, last = period
+        by_date = index["by_date"]
+        if last - first <= timedelta(days=7):
+            # Look up each day of the period instead of scanning the thread's dates
+            days = [day for day in ((first + timedelta(days=n)).isoformat() for n in range((last - first).days + 1))
+                    if day in by_date]
+        else:
+            days = sorted(day for day in by_date if day >= first.isoformat())
+        bookings = sum(by_date[day]["bookings"] for day in days)
+        guests = sum(by_date[day]["guests"] for day in days)
+        if not bookings:
+            response = f"You have no bookings {label}."
+        else:
+            response = f"📅 You have {plural(bookings, 'booking')} {label} ({plural(guests, 'guest')}):\n"
+            response += "\n".join(
+                f"- {date.fromisoformat(day).strftime('%a %d %b')}: {plural(by_date[day]['bookings'], 'booking')}, "
+                f"{plural(by_date[day]['guests'], 'guest')}" for day in days
+            )
+        if index["undated"]:
+            response += f"\n\n💡 {plural(index['undated'], 'booking')} without a specific date not included."
+        return response
+
+    if asks_guests:
+        verb = "is" if index["count"] == 1 else "are"
+        response = f"👥 Your {plural(index['count'], 'booking')} {verb} for {plural(index['total_guests'], 'guest')} in total."
+        if index["unsized"]:
+            response += f" ({plural(index['unsized'], 'booking')} without a party size not counted.)"
+        return response
+
+    if "how many" in message or "total" in message or "count" in message:
+        return f"📋 You have {plural(index['count'], 'booking')} on record ({plural(index['total_guests'], 'guest')} in total)."
+
+    return index["summary"]
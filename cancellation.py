@@ -0,0 +1,67 @@
+import asyncio
+import contextvars
+import threading
+
+# -------------------
+# Background loop
+# -------------------
+_loop = None
+_loop_lock = threading.Lock()
+
+def get_loop() -> asyncio.AbstractEventLoop:
+    """One long-lived loop for async LLM calls made from sync graph nodes,
+    so the async client always sees the same loop."""
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="llm-loop", daemon=True).start()
+    return _loop
+
+# -------------------
+# Cancel scopes
+# -------------------
+class CancelScope:
+    """Collects the in-flight async calls of one turn so they can be aborted together."""
+
+    def __init__(self):
+        self.cancelled = False
+        self.futures = set()
+        self.lock = threading.Lock()
+
+    def track(self, future):
+        with self.lock:
+            if self.cancelled:
+                future.cancel()
+                return
+            self.futures.add(future)
+        future.add_done_callback(self._discard)
+
+    def _discard(self, future):
+        with self.lock:
+            self.futures.discard(future)
+
+    def cancel(self):
+        with self.lock:
+            self.cancelled = True
+            futures = list(self.futures)
+            self.futures.clear()
+        for future in futures:
+            future.cancel()
+
+current_scope = contextvars.ContextVar("cancel_scope", default=None)
+
+def cancellable() -> bool:
+    return current_scope.get() is not None
+
+def submit(coro_fn):
+    """
+    Start coro_fn() on the background loop and return a concurrent Future.
+    Inside a cancel scope the future is tracked, so cancelling the scope
+    cancels the task and aborts its HTTP request.
+    """
+    future = asyncio.run_coroutine_threadsafe(coro_fn(), get_loop())
+    scope = current_scope.get()
+    if scope is not None:
+        scope.track(future)
+    return future
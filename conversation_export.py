@@ -0,0 +1,247 @@
+"""
+Streaming export/import of conversations stored in the checkpoint database.
+
+Export walks every thread once, in thread_id order, reading only the latest
+checkpoint per thread in small keyset-paginated batches, so memory stays bounded
+and no long read transaction blocks the server's checkpoint writes.
+
+Usage:
+    python conversation_export.py export --format ndjson -o conversations.ndjson
+    python conversation_export.py export --format parquet -o conversations.parquet
+    python conversation_export.py import conversations.ndjson --db other.db
+"""
+
+import argparse
+import json
+import sqlite3
+import sys
+from datetime import datetime, timedelta, timezone
+
+from langchain_core.messages import messages_from_dict, messages_to_dict
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+
+EXPORT_BATCH_SIZE = 500
+PARQUET_ROW_GROUP_SIZE = 1000
+
+_UUID_EPOCH = datetime(1582, 10, 15, tzinfo=timezone.utc)
+
+# -------------------
+# Export
+# -------------------
+def checkpoint_id_time(checkpoint_id: str) -> str:
+    """Checkpoint ids are UUIDv6, so the creation time can be read without loading the checkpoint."""
+    hex_id = checkpoint_id.replace("-", "")
+    ticks = int(hex_id[0:12] + hex_id[13:16], 16)  # 100ns intervals since the UUID epoch
+    return (_UUID_EPOCH + timedelta(microseconds=ticks // 10)).isoformat()
+
+def thread_filter(thread_prefix: str | None) -> tuple[str, str, tuple]:
+    """(first key to start after, extra WHERE clause, its params) for one tenant's threads."""
+    if thread_prefix is None:
+        return "", "", ()
+    if not thread_prefix:
+        # The default tenant's keys are the unprefixed ones
+        return "", "AND instr(thread_id, ':') = 0", ()
+    # Keys under "acme:" sort between "acme:" and "acme;"
+    return thread_prefix, "AND thread_id < ?", (thread_prefix[:-1] + chr(ord(thread_prefix[-1]) + 1),)
+
+def iter_conversations(db_path: str, batch_size: int = EXPORT_BATCH_SIZE, thread_prefix: str | None = None):
+    """
+    Yield one export record per thread from the latest checkpoint of each thread.
+    With thread_prefix, only threads under that prefix are read ("" for unprefixed
+    ones), and the prefix is stripped from the exported thread ids.
+    """
+    serde = JsonPlusSerializer()
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True, check_same_thread=False)
+    last_thread_id, where, params = thread_filter(thread_prefix)
+    try:
+        while True:
+            rows = conn.execute(
+                f"""
+                SELECT c.thread_id, t.first_id, c.checkpoint_id, c.type, c.checkpoint
+                FROM (
+                    SELECT thread_id, MIN(checkpoint_id) AS first_id, MAX(checkpoint_id) AS last_id
+                    FROM checkpoints
+                    WHERE checkpoint_ns = '' AND thread_id > ? {where}
+                    GROUP BY thread_id
+                    ORDER BY thread_id
+                    LIMIT ?
+                ) t
+                JOIN checkpoints c
+                  ON c.thread_id = t.thread_id AND c.checkpoint_ns = '' AND c.checkpoint_id = t.last_id
+                ORDER BY c.thread_id
+                """,
+                (last_thread_id, *params, batch_size)
+            ).fetchall()
+            if not rows:
+                return
+
+            for thread_id, first_id, checkpoint_id, type_, blob in rows:
+                checkpoint = serde.loads_typed((type_, blob))
+                values = checkpoint.get("channel_values", {})
+                yield {
+                    "thread_id": thread_id[len(thread_prefix or ""):],
+                    "created_at": checkpoint_id_time(first_id),
+                    "updated_at": checkpoint.get("ts"),
+                    "checkpoint_id": checkpoint_id,
+                    "messages": messages_to_dict(values.get("messages", [])),
+                    "booking_history": values.get("booking_history", []),
+                }
+
+            last_thread_id = rows[-1][0]
+            del rows
+    finally:
+        conn.close()
+
+def iter_ndjson(records):
+    """Encode records as NDJSON lines."""
+    for record in records:
+        yield json.dumps(record, ensure_ascii=False) + "\n"
+
+def write_ndjson(records, fp) -> int:
+    count = 0
+    for line in iter_ndjson(records):
+        fp.write(line)
+        count += 1
+    return count
+
+def _parquet_schema():
+    import pyarrow as pa
+
+    return pa.schema([
+        ("thread_id", pa.string()),
+        ("created_at", pa.string()),
+        ("updated_at", pa.string()),
+        ("checkpoint_id", pa.string()),
+        ("message_count", pa.int32()),
+        ("messages", pa.string()),         # JSON, langchain messages_to_dict format
+        ("booking_history", pa.string()),  # JSON
+    ])
+
+def write_parquet(records, path, row_group_size: int = PARQUET_ROW_GROUP_SIZE) -> int:
+    """Write records to Parquet one row group at a time."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = _parquet_schema()
+    count = 0
+    batch = []
+
+    with pq.ParquetWriter(path, schema, compression="zstd") as writer:
+        def flush():
+            columns = {name: [row[name] for row in batch] for name in schema.names}
+            writer.write_table(pa.Table.from_pydict(columns, schema=schema))
+            batch.clear()
+
+        for record in records:
+            batch.append({
+                **record,
+                "message_count": len(record["messages"]),
+                "messages": json.dumps(record["messages"], ensure_ascii=False),
+                "booking_history": json.dumps(record["booking_history"], ensure_ascii=False),
+            })
+            count += 1
+            if len(batch) >= row_group_size:
+                flush()
+        if batch:
+            flush()
+
+    return count
+
+# -------------------
+# Import
+# -------------------
+def read_ndjson(lines):
+    for line in lines:
+        if isinstance(line, bytes):
+            line = line.decode("utf-8")
+        line = line.strip()
+        if line:
+            yield json.loads(line)
+
+def read_parquet(path):
+    import pyarrow.parquet as pq
+
+    parquet_file = pq.ParquetFile(path)
+    for batch in parquet_file.iter_batches(batch_size=PARQUET_ROW_GROUP_SIZE):
+        for row in batch.to_pylist():
+            yield {
+                **row,
+                "messages": json.loads(row["messages"]),
+                "booking_history": json.loads(row["booking_history"]),
+            }
+
+def import_conversation(chatbot, record: dict):
+    """
+    Write one exported thread into the graph's checkpointer. Re-importing is
+    idempotent: add_messages replaces messages by id and booking_history is overwritten.
+    """
+    config = {'configurable': {'thread_id': record["thread_id"]}}
+    values = {
+        "messages": messages_from_dict(record.get("messages", [])),
+        "booking_history": record.get("booking_history", []),
+    }
+    if record.get("tenant_id"):
+        values["tenant_id"] = record["tenant_id"]
+    chatbot.update_state(
+        config,
+        values,
+        # A node that leads to END, so the imported thread has nothing pending
+        as_node="booking_query_handler"
+    )
+
+def import_conversations(chatbot, records) -> dict:
+    threads = 0
+    messages = 0
+    for record in records:
+        import_conversation(chatbot, record)
+        threads += 1
+        messages += len(record.get("messages", []))
+    return {"threads": threads, "messages": messages}
+
+# -------------------
+# CLI
+# -------------------
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    export_parser = subparsers.add_parser("export", help="export all threads")
+    export_parser.add_argument("--db", default="chatbot_clean.db")
+    export_parser.add_argument("--format", choices=["ndjson", "parquet"], default="ndjson")
+    export_parser.add_argument("-o", "--output", help="output file (ndjson defaults to stdout)")
+
+    import_parser = subparsers.add_parser("import", help="import threads from an export")
+    import_parser.add_argument("input", help=".ndjson or .parquet file")
+    import_parser.add_argument("--db", default="chatbot_clean.db")
+
+    args = parser.parse_args()
+
+    if args.command == "export":
+        records = iter_conversations(args.db)
+        if args.format == "parquet":
+            if not args.output:
+                parser.error("--output is required for parquet")
+            count = write_parquet(records, args.output)
+        elif args.output:
+            with open(args.output, "w", encoding="utf-8") as fp:
+                count = write_ndjson(records, fp)
+        else:
+            count = write_ndjson(records, sys.stdout)
+        print(f"✓ Exported {count} threads", file=sys.stderr)
+        return
+
+    from langgraph.checkpoint.sqlite import SqliteSaver
+    from langgraph_tool_backend import build_graph
+
+    conn = sqlite3.connect(database=args.db, check_same_thread=False)
+    chatbot = build_graph(SqliteSaver(conn=conn))
+    if args.input.endswith(".parquet"):
+        result = import_conversations(chatbot, read_parquet(args.input))
+    else:
+        with open(args.input, encoding="utf-8") as fp:
+            result = import_conversations(chatbot, read_ndjson(fp))
+    conn.close()
+    print(f"✓ Imported {result['threads']} threads ({result['messages']} messages)", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
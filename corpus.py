@@ -0,0 +1,212 @@
+"""
+Conversation corpus recorder.
+
+Records anonymized turns of live traffic so they can be replayed against the
+graph later (see replay.py). One JSON object per turn, gzip-compressed NDJSON:
+
+    {"v": 1, "t": "<thread key>", "i": <turn index>, "ts": <unix time>,
+     "tenant": "<tenant id>", "in": "<user message>", "route": "<first node after input_validator | END>",
+     "nodes": [{"n": "<node>", "ms": <duration>, "out": ["<AI text>", ...]}, ...],
+     "ans": "<last AI text>", "ms": <turn duration>}
+
+Thread ids are replaced by salted hashes, and emails, URLs, phone and other long
+numbers and timestamps in inputs and outputs are masked. Free-text names are not detected.
+
+Config:
+    CORPUS_RECORD_PATH   file to append to, e.g. corpus/traffic.ndjson.gz (empty = off)
+    CORPUS_SAMPLE_RATIO  share of threads to record, 0.0 - 1.0 (default 1)
+    CORPUS_SALT          salt for thread keys (default: random per process)
+"""
+
+import atexit
+import gzip
+import hashlib
+import json
+import os
+import re
+import secrets
+import threading
+import time
+from collections import OrderedDict
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.messages import AIMessage
+
+from tenants import DEFAULT_TENANT
+
+CORPUS_RECORD_PATH = os.getenv("CORPUS_RECORD_PATH", "")
+CORPUS_SAMPLE_RATIO = float(os.getenv("CORPUS_SAMPLE_RATIO", "1"))
+CORPUS_SALT = os.getenv("CORPUS_SALT") or secrets.token_hex(8)
+FLUSH_EVERY = 50
+MAX_TRACKED_THREADS = 100_000
+FORMAT_VERSION = 1
+
+ANONYMIZERS = [
+    # Timestamps first: they are volatile (replays would never match) and look like phone numbers
+    (re.compile(r"\d{4}-\d{2}-\d{2}[ T]\d{2}:\d{2}(?::\d{2}(?:\.\d+)?)?"), "<timestamp>"),
+    (re.compile(r"[\w.+-]+@[\w-]+(?:\.[\w-]+)+"), "<email>"),
+    (re.compile(r"https?://\S+|www\.\S+"), "<url>"),
+    (re.compile(r"\+?\d[\d\s().-]{6,}\d"), "<phone>"),
+    (re.compile(r"\d{5,}"), "<number>"),
+]
+
+def anonymize(text) -> str:
+    if not isinstance(text, str):
+        return ""
+    for pattern, replacement in ANONYMIZERS:
+        text = pattern.sub(replacement, text)
+    return text
+
+def thread_key(thread_id: str, salt: str = CORPUS_SALT) -> str:
+    return hashlib.sha256(f"{salt}:{thread_id}".encode("utf-8")).hexdigest()[:16]
+
+def ai_texts(output) -> list[str]:
+    """Anonymized text of the AI messages in a node's output."""
+    messages = output.get("messages", []) if isinstance(output, dict) else []
+    return [anonymize(m.content) for m in messages if isinstance(m, AIMessage) and m.content]
+
+# -------------------
+# Reading & writing
+# -------------------
+def open_corpus(path: str, mode: str = "rt"):
+    if path.endswith(".gz"):
+        return gzip.open(path, mode, encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+def read_corpus(path: str):
+    """Yield turn records; works on multi-member gzip files written by CorpusWriter."""
+    with open_corpus(path) as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+class CorpusWriter:
+    """Buffers records and appends them in batches (each batch is one gzip member)."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.lock = threading.Lock()
+        self.buffer = []
+        self.written = 0
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        atexit.register(self.flush)
+
+    def write(self, record: dict):
+        with self.lock:
+            self.buffer.append(json.dumps(record, ensure_ascii=False, separators=(",", ":")))
+            if len(self.buffer) >= FLUSH_EVERY:
+                self._flush()
+
+    def flush(self):
+        with self.lock:
+            self._flush()
+
+    def _flush(self):
+        if not self.buffer:
+            return
+        with open_corpus(self.path, "at") as f:
+            f.write("\n".join(self.buffer) + "\n")
+        self.written += len(self.buffer)
+        self.buffer = []
+
+# -------------------
+# Recording
+# -------------------
+class TurnRecorder(BaseCallbackHandler):
+    """Collects one graph run's nodes, outputs and timings into a turn record."""
+
+    def __init__(self, recorder: "CorpusRecorder", thread_id: str):
+        self.recorder = recorder
+        self.thread_id = thread_id
+        self.graph_run_id = None
+        self.started = {}
+        self.nodes = []
+        self.message = ""
+        self.tenant_id = None
+        self.start = None
+
+    def on_chain_start(self, serialized, inputs, *, run_id, parent_run_id=None, metadata=None, **kwargs):
+        if parent_run_id is None:
+            self.graph_run_id = run_id
+            self.start = time.perf_counter()
+            messages = inputs.get("messages", []) if isinstance(inputs, dict) else []
+            self.message = messages[-1].content if messages else ""
+            self.tenant_id = inputs.get("tenant_id") if isinstance(inputs, dict) else None
+        elif parent_run_id == self.graph_run_id and (metadata or {}).get("langgraph_node"):
+            self.started[run_id] = (metadata["langgraph_node"], time.perf_counter())
+
+    def on_chain_end(self, outputs, *, run_id, **kwargs):
+        if run_id in self.started:
+            node, start = self.started.pop(run_id)
+            self.nodes.append({"n": node, "ms": round((time.perf_counter() - start) * 1000, 3), "out": ai_texts(outputs)})
+        elif run_id == self.graph_run_id:
+            self.recorder.record(self.thread_id, self.message, self.nodes, (time.perf_counter() - self.start) * 1000,
+                                 tenant_id=self.tenant_id)
+
+    def on_chain_error(self, error, *, run_id, **kwargs):
+        self.started.pop(run_id, None)
+        if run_id == self.graph_run_id:
+            self.recorder.record(self.thread_id, self.message, self.nodes,
+                                 (time.perf_counter() - self.start) * 1000, error=type(error).__name__,
+                                 tenant_id=self.tenant_id)
+
+def summarize_turn(nodes: list) -> tuple[str, str]:
+    """(route, answer) of a turn from its node list."""
+    names = [node["n"] for node in nodes]
+    route = names[names.index("input_validator") + 1] if "input_validator" in names[:-1] else "END"
+    answer = next((node["out"][-1] for node in reversed(nodes) if node["out"]), "")
+    return route, answer
+
+class CorpusRecorder:
+    def __init__(self, path: str = CORPUS_RECORD_PATH, sample_ratio: float = CORPUS_SAMPLE_RATIO):
+        self.writer = CorpusWriter(path) if path else None
+        self.sample_ratio = sample_ratio
+        self.lock = threading.Lock()
+        self.turns = OrderedDict()  # thread key -> turns recorded so far
+
+    @property
+    def enabled(self) -> bool:
+        return self.writer is not None
+
+    def sampled(self, key: str) -> bool:
+        # Decided per thread (from its key), so a sampled thread is recorded in full
+        return int(key[:8], 16) / 0xFFFFFFFF < self.sample_ratio
+
+    def record(self, thread_id: str, message: str, nodes: list, elapsed_ms: float, error: str | None = None,
+               tenant_id: str | None = None):
+        key = thread_key(thread_id)
+        with self.lock:
+            index = self.turns.pop(key, 0)
+            self.turns[key] = index + 1
+            if len(self.turns) > MAX_TRACKED_THREADS:
+                self.turns.popitem(last=False)
+        route, answer = summarize_turn(nodes)
+        record = {
+            "v": FORMAT_VERSION, "t": key, "i": index, "ts": round(time.time(), 3),
+            "tenant": tenant_id or DEFAULT_TENANT, "in": anonymize(message), "route": route, "nodes": nodes, "ans": answer,
+            "ms": round(elapsed_ms, 3),
+        }
+        if error:
+            record["error"] = error
+        self.writer.write(record)
+
+    def config(self, config: dict) -> dict:
+        """Attach a turn recorder to a graph config when recording is on and the thread is sampled."""
+        if not self.enabled:
+            return config
+        thread_id = config.get("configurable", {}).get("thread_id", "")
+        if not self.sampled(thread_key(thread_id)):
+            return config
+        return {**config, "callbacks": [*config.get("callbacks", []), TurnRecorder(self, thread_id)]}
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "path": self.writer.path if self.writer else None,
+            "sample_ratio": self.sample_ratio,
+            "written": self.writer.written if self.writer else 0,
+        }
+
+corpus_recorder = CorpusRecorder()
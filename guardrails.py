@@ -0,0 +1,113 @@
+import os
+import re
+import threading
+
+# -------------------
+# Config
+# -------------------
+OUTPUT_GUARDRAIL = os.getenv("OUTPUT_GUARDRAIL", "1") != "0"
+OUTPUT_MASK_CHAR = os.getenv("OUTPUT_MASK_CHAR", "*")
+
+WORD_CHARS = re.compile(r"\w+$")
+WORD_START = re.compile(r"\w")
+
+# -------------------
+# Output guard
+# -------------------
+class OutputGuard:
+    """
+    Masks filtered words in model output.
+
+    Terms match as whole words (plus a plural "s"), unlike the input filter's
+    substring check, so "class" or "hello" are left alone in answers.
+
+    Counters are per response: each stored LLM answer or tool result is
+    checked once by redact(); streamed copies of it are masked uncounted.
+    """
+
+    def __init__(self, terms: list[str], enabled: bool = OUTPUT_GUARDRAIL):
+        words = sorted({t.lower() for t in terms if t}, key=len, reverse=True)
+        self.enabled = enabled and bool(words)
+        self.pattern = re.compile(r"\b(?:" + "|".join(map(re.escape, words)) + r")s?\b", re.IGNORECASE)
+        # Every prefix of a term (or its plural): a stream must hold back a
+        # trailing partial word only while it is one of these
+        self.prefixes = frozenset(
+            form[:i] for word in words for form in (word, word + "s") for i in range(1, len(form) + 1)
+        )
+        self.lock = threading.Lock()
+        self.checked = 0
+        self.redactions = 0
+
+    def _mask(self, match) -> str:
+        return OUTPUT_MASK_CHAR * len(match.group(0))
+
+    def _apply(self, text: str) -> tuple[str, int]:
+        return self.pattern.subn(self._mask, text)
+
+    def redact(self, text: str) -> str:
+        """Check a complete response and mask every filtered word."""
+        if not self.enabled or not isinstance(text, str) or not text:
+            return text
+        redacted, count = self._apply(text)
+        with self.lock:
+            self.checked += 1
+            self.redactions += count
+        return redacted
+
+    def stream(self) -> "StreamRedactor":
+        return StreamRedactor(self)
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {"enabled": self.enabled, "checked": self.checked, "redactions": self.redactions}
+
+class StreamRedactor:
+    """
+    Incremental redaction for one token stream.
+
+    feed() returns the text that is safe to send now. Only a trailing partial
+    word that could still grow into a filtered term is held back, so at most
+    one word is delayed and the rest of the response is never buffered.
+    Nothing is counted here; the node that stores the response counts it.
+    """
+
+    def __init__(self, guard: OutputGuard):
+        self.guard = guard
+        self.pending = ""
+        self.mid_word = False  # the text sent so far ends inside a word
+        self.message_id = None
+
+    def feed(self, chunk: str, message_id: str | None = None) -> str:
+        """A chunk from a different message first releases the previous message's tail."""
+        if not self.guard.enabled or not isinstance(chunk, str):
+            return chunk
+        released = ""
+        if message_id != self.message_id:
+            released = self.flush()
+            self.message_id = message_id
+        text = self.pending + chunk
+        tail = WORD_CHARS.search(text)
+        if tail and tail.group(0).lower() in self.guard.prefixes and not (tail.start() == 0 and self.mid_word):
+            self.pending = tail.group(0)
+            text = text[:tail.start()]
+        else:
+            self.pending = ""
+        return released + self._emit(text)
+
+    def flush(self) -> str:
+        """Release whatever is held back, at the end of a message."""
+        text, self.pending = self.pending, ""
+        output = self._emit(text)
+        self.mid_word = False
+        return output
+
+    def _emit(self, text: str) -> str:
+        if not text:
+            return ""
+        if self.mid_word and WORD_START.match(text):
+            # Continues a word already sent, so it cannot start a filtered term
+            output = self.guard._apply("x" + text)[0][1:]
+        else:
+            output = self.guard._apply(text)[0]
+        self.mid_word = bool(WORD_CHARS.search(text))
+        return output
@@ -0,0 +1,148 @@
+import asyncio
+import os
+import time
+from datetime import datetime, timezone
+
+# -------------------
+# Config
+# -------------------
+HEALTH_PROBE_INTERVAL = float(os.getenv("HEALTH_PROBE_INTERVAL", "15"))
+HEALTH_PROBE_TIMEOUT = float(os.getenv("HEALTH_PROBE_TIMEOUT", "3"))
+# A component is reported failed after this many consecutive failed probes
+HEALTH_FAILURE_THRESHOLD = int(os.getenv("HEALTH_FAILURE_THRESHOLD", "2"))
+
+def utc_now() -> str:
+    return datetime.now(timezone.utc).isoformat().replace("+00:00", "Z")
+
+# -------------------
+# Probes
+# -------------------
+class Probe:
+    """One dependency check and its cached result."""
+
+    def __init__(self, name: str, check, interval: float = HEALTH_PROBE_INTERVAL,
+                 timeout: float = HEALTH_PROBE_TIMEOUT, critical: bool = True):
+        """
+        check: sync or async callable; it fails by raising or returning False.
+        critical: a failing critical probe makes the worker not ready.
+        """
+        self.name = name
+        self.check = check
+        self.interval = interval
+        self.timeout = timeout
+        self.critical = critical
+        self.checked_at = None
+        self.last_success_at = None
+        self.latency_ms = None
+        self.consecutive_failures = 0
+        self.total_errors = 0
+        self.last_error = None
+        self.next_run = 0.0
+
+    @property
+    def healthy(self) -> bool:
+        if self.last_success_at is None:
+            return False
+        return self.consecutive_failures < HEALTH_FAILURE_THRESHOLD
+
+    async def run(self):
+        start = time.perf_counter()
+        try:
+            if asyncio.iscoroutinefunction(self.check):
+                result = await asyncio.wait_for(self.check(), self.timeout)
+            else:
+                # A hung sync check keeps its thread, but the probe still times out
+                result = await asyncio.wait_for(asyncio.to_thread(self.check), self.timeout)
+            if result is False:
+                raise RuntimeError("check returned False")
+            self.consecutive_failures = 0
+            self.last_error = None
+            self.last_success_at = utc_now()
+        except asyncio.TimeoutError:
+            self._failed(f"timed out after {self.timeout}s")
+        except Exception as e:
+            self._failed(f"{type(e).__name__}: {e}")
+        self.latency_ms = round((time.perf_counter() - start) * 1000, 2)
+        self.checked_at = utc_now()
+        self.next_run = time.monotonic() + self.interval
+
+    def _failed(self, error: str):
+        self.consecutive_failures += 1
+        self.total_errors += 1
+        self.last_error = error
+
+    def snapshot(self) -> dict:
+        return {
+            "status": "operational" if self.healthy else ("pending" if self.checked_at is None else "failed"),
+            "healthy": self.healthy,
+            "critical": self.critical,
+            "checked_at": self.checked_at,
+            "last_success_at": self.last_success_at,
+            "latency_ms": self.latency_ms,
+            "consecutive_failures": self.consecutive_failures,
+            "total_errors": self.total_errors,
+            "last_error": self.last_error,
+        }
+
+# -------------------
+# Monitor
+# -------------------
+class HealthMonitor:
+    """
+    Runs every probe on its own interval in a background task and keeps a
+    ready-made report, so health endpoints never touch a dependency themselves.
+    """
+
+    def __init__(self):
+        self.probes = {}
+        self.started_at = utc_now()
+        self.task = None
+        self.report = self._build_report()
+
+    def add_probe(self, probe: Probe):
+        self.probes[probe.name] = probe
+        self.report = self._build_report()
+
+    async def run_all(self):
+        """Probe everything once, concurrently."""
+        await asyncio.gather(*(probe.run() for probe in self.probes.values()))
+        self.report = self._build_report()
+
+    async def _loop(self):
+        while True:
+            now = time.monotonic()
+            due = [probe for probe in self.probes.values() if probe.next_run <= now]
+            if due:
+                await asyncio.gather(*(probe.run() for probe in due))
+                self.report = self._build_report()
+            next_run = min((probe.next_run for probe in self.probes.values()), default=now + HEALTH_PROBE_INTERVAL)
+            await asyncio.sleep(max(0.5, next_run - time.monotonic()))
+
+    def start(self):
+        if self.task is None:
+            self.task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+
+    @property
+    def running(self) -> bool:
+        return self.task is not None and not self.task.done()
+
+    def _build_report(self) -> dict:
+        components = {name: probe.snapshot() for name, probe in self.probes.items()}
+        ready = all(c["healthy"] for c in components.values() if c["critical"])
+        healthy = all(c["healthy"] for c in components.values())
+        return {
+            "status": "healthy" if healthy else ("degraded" if ready else "unhealthy"),
+            "ready": ready,
+            "checked_at": utc_now(),
+            "started_at": self.started_at,
+            "components": components,
+        }
@@ -0,0 +1,288 @@
+"""
+Durable background job queue for work that does not need to finish before a
+reply is sent (confirmation emails, thread summarization, ...).
+
+Jobs are rows in a local SQLite database (JOBS_DB_PATH), so they survive a
+restart and can be enqueued from any process, including node pool workers.
+Worker threads claim jobs with a lease: a job whose worker died is picked up
+again once its lease runs out. A failing job is retried with exponential
+backoff and moved to the dead letter state after its last attempt; dead jobs
+stay in the table until retried via /admin/jobs/{id}/retry.
+
+Handlers are registered per job kind and receive the job's JSON payload:
+
+    @job_queue.handler("booking_confirmation")
+    def send_confirmation(payload: dict): ...
+
+    job_queue.enqueue("booking_confirmation", {"booking": booking})
+
+Delivery is at least once; handlers should be safe to run twice.
+"""
+
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+from collections import deque
+
+# -------------------
+# Config
+# -------------------
+JOBS_DB_PATH = os.getenv("JOBS_DB_PATH", "jobs.db")
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "5"))
+# Retry n waits JOB_RETRY_BASE_SECONDS * 2**(n-1), with jitter
+JOB_RETRY_BASE_SECONDS = float(os.getenv("JOB_RETRY_BASE_SECONDS", "2"))
+# A running job is handed to another worker if not finished within its lease
+JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", "60"))
+# Idle workers re-check for due jobs this often (enqueues in this process wake them at once)
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "1"))
+
+RECENT_JOBS = 200
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    dedupe_key TEXT,
+    status TEXT NOT NULL DEFAULT 'queued',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL,
+    enqueued_at REAL NOT NULL,
+    run_at REAL NOT NULL,
+    lease_until REAL,
+    last_error TEXT
+);
+CREATE INDEX IF NOT EXISTS jobs_due ON jobs (status, run_at);
+CREATE UNIQUE INDEX IF NOT EXISTS jobs_pending_key ON jobs (dedupe_key) WHERE status = 'queued';
+"""
+
+def backoff(attempts: int, base: float = JOB_RETRY_BASE_SECONDS) -> float:
+    delay = base * 2 ** (attempts - 1)
+    return delay * random.uniform(0.8, 1.2)
+
+def percentile(values: list, share: float) -> float:
+    values = sorted(values)
+    return values[max(0, int(len(values) * share) - 1)] if values else 0.0
+
+# -------------------
+# Queue
+# -------------------
+class JobQueue:
+    """SQLite-backed queue plus the worker threads that drain it."""
+
+    def __init__(self, path: str = JOBS_DB_PATH, workers: int = JOB_WORKERS,
+                 max_attempts: int = JOB_MAX_ATTEMPTS, lease_seconds: float = JOB_LEASE_SECONDS,
+                 poll_interval: float = JOB_POLL_INTERVAL):
+        self.path = path
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        self.handlers = {}
+        self.lock = threading.Lock()
+        self.wake = threading.Event()
+        self.stopping = threading.Event()
+        self.threads = []
+        self._conn = None
+        self._pid = None
+        self.counters = {"enqueued": 0, "deduplicated": 0, "completed": 0, "retried": 0, "dead_lettered": 0}
+        self.recent = deque(maxlen=RECENT_JOBS)  # (wait ms, run ms) of finished attempts
+
+    # Opened lazily and per process: a forked node pool worker must not reuse the parent's connection
+    @property
+    def conn(self) -> sqlite3.Connection:
+        if self._conn is None or self._pid != os.getpid():
+            conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None, timeout=30)
+            conn.row_factory = sqlite3.Row
+            if self.path != ":memory:":
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(SCHEMA)
+            self._conn, self._pid = conn, os.getpid()
+        return self._conn
+
+    def handler(self, kind: str):
+        """Register the function that runs jobs of this kind."""
+        def register(fn):
+            self.handlers[kind] = fn
+            return fn
+        return register
+
+    def enqueue(self, kind: str, payload: dict, dedupe_key: str | None = None, delay: float = 0.0,
+                max_attempts: int | None = None) -> int | None:
+        """
+        Persist a job and wake a worker. With dedupe_key, a job that is still
+        queued under the same key absorbs this one (returns None).
+        """
+        now = time.time()
+        with self.lock:
+            cursor = self.conn.execute(
+                "INSERT OR IGNORE INTO jobs (kind, payload, dedupe_key, max_attempts, enqueued_at, run_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (kind, json.dumps(payload, ensure_ascii=False), dedupe_key,
+                 max_attempts or self.max_attempts, now, now + delay)
+            )
+            job_id = cursor.lastrowid if cursor.rowcount else None
+            self.counters["enqueued" if job_id else "deduplicated"] += 1
+        self.wake.set()
+        return job_id
+
+    def _claim(self) -> sqlite3.Row | None:
+        now = time.time()
+        with self.lock:
+            return self.conn.execute(
+                "UPDATE jobs SET status = 'running', attempts = attempts + 1, lease_until = ? "
+                "WHERE id = (SELECT id FROM jobs WHERE (status = 'queued' AND run_at <= ?) "
+                "OR (status = 'running' AND lease_until < ?) ORDER BY run_at LIMIT 1) RETURNING *",
+                (now + self.lease_seconds, now, now)
+            ).fetchone()
+
+    def _run(self, job: sqlite3.Row):
+        started = time.time()
+        handler = self.handlers.get(job["kind"])
+        try:
+            if handler is None:
+                raise LookupError(f"No handler registered for job kind {job['kind']!r}")
+            handler(json.loads(job["payload"]))
+        except Exception as e:
+            self._failed(job, f"{type(e).__name__}: {e}")
+            if job["attempts"] >= job["max_attempts"]:
+                print(f"❌ Job {job['id']} ({job['kind']}) dead-lettered after {job['attempts']} attempts: {e}")
+        else:
+            with self.lock:
+                self.conn.execute("DELETE FROM jobs WHERE id = ?", (job["id"],))
+                self.counters["completed"] += 1
+        finished = time.time()
+        with self.lock:
+            self.recent.append(((started - job["run_at"]) * 1000, (finished - started) * 1000))
+
+    def _failed(self, job: sqlite3.Row, error: str):
+        with self.lock:
+            if job["attempts"] >= job["max_attempts"]:
+                self.conn.execute("UPDATE jobs SET status = 'dead', lease_until = NULL, last_error = ? WHERE id = ?",
+                                  (error, job["id"]))
+                self.counters["dead_lettered"] += 1
+            else:
+                try:
+                    self.conn.execute(
+                        "UPDATE jobs SET status = 'queued', lease_until = NULL, last_error = ?, run_at = ? WHERE id = ?",
+                        (error, time.time() + backoff(job["attempts"]), job["id"])
+                    )
+                except sqlite3.IntegrityError:
+                    # A newer job with the same dedupe key is already queued and covers this one
+                    self.conn.execute("DELETE FROM jobs WHERE id = ?", (job["id"],))
+                self.counters["retried"] += 1
+
+    def _work(self):
+        while not self.stopping.is_set():
+            try:
+                job = self._claim()
+            except sqlite3.Error as e:
+                print(f"⚠️ Job queue unavailable: {e}")
+                job = None
+            if job is None:
+                self.wake.wait(self.poll_interval)
+                self.wake.clear()
+                continue
+            self._run(job)
+
+    def start(self) -> bool:
+        """Start the worker threads. Returns False if JOB_WORKERS is 0."""
+        if self.workers <= 0:
+            return False
+        if not self.running:
+            self.stopping.clear()
+            self.threads = [threading.Thread(target=self._work, name=f"job-worker-{i}", daemon=True)
+                            for i in range(self.workers)]
+            for thread in self.threads:
+                thread.start()
+        return True
+
+    def stop(self, timeout: float = 10.0):
+        """Let running jobs finish (up to timeout); queued jobs stay in the database."""
+        self.stopping.set()
+        self.wake.set()
+        for thread in self.threads:
+            thread.join(timeout)
+        self.threads = []
+
+    @property
+    def running(self) -> bool:
+        return any(thread.is_alive() for thread in self.threads)
+
+    def drain(self, timeout: float = 30.0) -> bool:
+        """Wait until no job is due or running (scheduled retries are not waited for)."""
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            stats = self.stats()
+            if not stats["depth"] and not stats["running"]:
+                return True
+            time.sleep(0.01)
+        return False
+
+    # -------------------
+    # Dead letters & metrics
+    # -------------------
+    def dead_letters(self, limit: int = 50) -> list[dict]:
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT id, kind, payload, attempts, enqueued_at, last_error FROM jobs "
+                "WHERE status = 'dead' ORDER BY id DESC LIMIT ?", (limit,)
+            ).fetchall()
+        return [{**dict(row), "payload": json.loads(row["payload"])} for row in rows]
+
+    def retry(self, job_id: int) -> bool:
+        """Give a dead-lettered job a fresh set of attempts."""
+        with self.lock:
+            cursor = self.conn.execute(
+                "UPDATE jobs SET status = 'queued', attempts = 0, run_at = ?, last_error = NULL "
+                "WHERE id = ? AND status = 'dead'", (time.time(), job_id)
+            )
+        self.wake.set()
+        return cursor.rowcount > 0
+
+    def stats(self) -> dict:
+        now = time.time()
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT "
+                "COUNT(*) FILTER (WHERE status = 'queued' AND run_at <= :now) AS depth, "
+                "COUNT(*) FILTER (WHERE status = 'queued' AND run_at > :now) AS scheduled, "
+                "COUNT(*) FILTER (WHERE status = 'running') AS running, "
+                "COUNT(*) FILTER (WHERE status = 'dead') AS dead, "
+                "MIN(run_at) FILTER (WHERE status = 'queued' AND run_at <= :now) AS oldest_due "
+                "FROM jobs", {"now": now}
+            ).fetchone()
+            by_kind = self.conn.execute(
+                "SELECT kind, status, COUNT(*) AS n FROM jobs GROUP BY kind, status"
+            ).fetchall()
+            counters = dict(self.counters)
+            recent = list(self.recent)
+        waits = [wait for wait, _ in recent]
+        runs = [run for _, run in recent]
+        kinds = {}
+        for kind_row in by_kind:
+            kinds.setdefault(kind_row["kind"], {})[kind_row["status"]] = kind_row["n"]
+        return {
+            "path": self.path,
+            "workers": self.workers,
+            "running_workers": sum(thread.is_alive() for thread in self.threads),
+            "depth": row["depth"],
+            "scheduled": row["scheduled"],
+            "running": row["running"],
+            "dead": row["dead"],
+            # How long the oldest due job has been waiting for a worker
+            "lag_seconds": round(now - row["oldest_due"], 3) if row["oldest_due"] else 0.0,
+            **counters,
+            "wait_ms_p50": round(percentile(waits, 0.5), 2),
+            "wait_ms_p95": round(percentile(waits, 0.95), 2),
+            "run_ms_p50": round(percentile(runs, 0.5), 2),
+            "run_ms_p95": round(percentile(runs, 0.95), 2),
+            "by_kind": kinds,
+        }
+
+job_queue = JobQueue()
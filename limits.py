@@ -0,0 +1,152 @@
+import json
+import os
+import threading
+import time
+import tracemalloc
+from collections import deque
+
+from fastapi import HTTPException
+
+# -------------------
+# Config
+# -------------------
+# Request bodies larger than this are rejected with 413 before any JSON parsing
+MAX_BODY_BYTES = int(os.getenv("MAX_BODY_BYTES", str(64 * 1024)))
+# The import endpoint parses NDJSON incrementally, so it gets its own, larger limit (0 = none)
+MAX_IMPORT_BODY_BYTES = int(os.getenv("MAX_IMPORT_BODY_BYTES", str(256 * 1024 * 1024)))
+# One NDJSON record (a whole thread) of an import; the partial line is all that is buffered
+MAX_IMPORT_LINE_BYTES = int(os.getenv("MAX_IMPORT_LINE_BYTES", str(16 * 1024 * 1024)))
+# Longer chat messages are turned away by input_validator before any other check
+MAX_MESSAGE_CHARS = int(os.getenv("MAX_MESSAGE_CHARS", "8000"))
+# Trace allocations and record each request's peak (costs some CPU; off by default)
+MEMORY_ACCOUNTING = os.getenv("MEMORY_ACCOUNTING", "0") == "1"
+
+BODY_LIMITS = {"/import/conversations": MAX_IMPORT_BODY_BYTES}
+RECENT_REQUESTS = 100
+
+# -------------------
+# Memory ledger
+# -------------------
+class MemoryLedger:
+    """
+    Per-request memory accounting: body bytes always, and with MEMORY_ACCOUNTING
+    the tracemalloc peak while the request ran. tracemalloc is process-wide, so a
+    peak measured while other requests were in flight is marked "concurrent".
+    """
+
+    def __init__(self, enabled: bool = MEMORY_ACCOUNTING):
+        self.enabled = enabled
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.overlap = 0  # bumped whenever a request starts while others are running
+        self.counters = {"requests": 0, "rejected": 0, "body_bytes": 0, "max_body_bytes": 0, "max_peak_bytes": 0}
+        self.recent = deque(maxlen=RECENT_REQUESTS)
+        if enabled and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def begin(self) -> dict:
+        entry = {"overlap": None, "base": 0, "concurrent": False}
+        with self.lock:
+            if self.in_flight:
+                entry["concurrent"] = True
+                self.overlap += 1
+            elif self.enabled:
+                tracemalloc.reset_peak()
+            self.in_flight += 1
+            entry["overlap"] = self.overlap
+            if self.enabled:
+                entry["base"] = tracemalloc.get_traced_memory()[0]
+        return entry
+
+    def end(self, entry: dict, path: str, status: int | None, body_bytes: int, elapsed_ms: float):
+        record = {"path": path, "status": status, "body_bytes": body_bytes, "elapsed_ms": round(elapsed_ms, 2)}
+        with self.lock:
+            self.in_flight -= 1
+            if self.enabled:
+                record["peak_bytes"] = max(0, tracemalloc.get_traced_memory()[1] - entry["base"])
+                record["concurrent"] = entry["concurrent"] or self.overlap != entry["overlap"] or self.in_flight > 0
+                self.counters["max_peak_bytes"] = max(self.counters["max_peak_bytes"], record["peak_bytes"])
+            self.counters["requests"] += 1
+            self.counters["rejected"] += status == 413
+            self.counters["body_bytes"] += body_bytes
+            self.counters["max_body_bytes"] = max(self.counters["max_body_bytes"], body_bytes)
+            self.recent.append(record)
+
+    def stats(self) -> dict:
+        with self.lock:
+            counters = dict(self.counters)
+            recent = list(self.recent)
+        stats = {
+            "limits": {"max_body_bytes": MAX_BODY_BYTES, "max_import_body_bytes": MAX_IMPORT_BODY_BYTES,
+                       "max_import_line_bytes": MAX_IMPORT_LINE_BYTES, "max_message_chars": MAX_MESSAGE_CHARS},
+            "accounting": self.enabled,
+            **counters,
+            "recent": recent,
+        }
+        if self.enabled:
+            stats["traced_bytes"], stats["traced_peak_bytes"] = tracemalloc.get_traced_memory()
+        return stats
+
+memory_ledger = MemoryLedger()
+
+# -------------------
+# Middleware
+# -------------------
+class RequestLimitMiddleware:
+    """
+    Pure ASGI middleware enforcing body size limits before anything parses the
+    body: a too-large Content-Length is refused without reading, and streamed
+    bodies are counted chunk by chunk and cut off once over the limit.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        limit = BODY_LIMITS.get(scope["path"], MAX_BODY_BYTES)
+        headers = dict(scope.get("headers") or [])
+        received = 0
+        status = None
+        started = False
+        entry = memory_ledger.begin()
+        start = time.perf_counter()
+
+        async def reject(detail: str):
+            nonlocal status
+            status = 413
+            body = json.dumps({"detail": detail}).encode()
+            await send({"type": "http.response.start", "status": 413,
+                        "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())]})
+            await send({"type": "http.response.body", "body": body})
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if limit and received > limit:
+                    raise HTTPException(status_code=413, detail=f"Request body exceeds {limit} bytes")
+            return message
+
+        async def send_wrapper(message):
+            nonlocal status, started
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                started = True
+            await send(message)
+
+        try:
+            content_length = headers.get(b"content-length")
+            if limit and content_length is not None and content_length.isdigit() and int(content_length) > limit:
+                return await reject(f"Request body exceeds {limit} bytes")
+            try:
+                await self.app(scope, limited_receive, send_wrapper)
+            except HTTPException as e:
+                if e.status_code != 413 or started:
+                    raise
+                await reject(e.detail)
+        finally:
+            memory_ledger.end(entry, scope["path"], status, received, (time.perf_counter() - start) * 1000)
@@ -0,0 +1,598 @@
+"""
+LLM routing layer used behind `llm` / `llm_with_tools`.
+
+Routes every call across one or more OpenAI-compatible endpoints:
+- complexity-based tiering: simple turns go to "cheap" endpoints, complex ones to "strong"
+- latency-ordered candidates (EWMA of time to first token)
+- hedging: if the first endpoint hasn't produced anything after LLM_HEDGE_AFTER_MS,
+  a second one is started and the first to respond wins
+- failover and per-endpoint circuit breakers on errors
+
+Endpoints come from a JSON file (LLM_ENDPOINTS_FILE), e.g.
+    [{"name": "openai-mini", "base_url": "https://api.openai.com/v1", "api_key_env": "OPENAI_API_KEY",
+      "model": "gpt-4o-mini", "tier": "cheap"},
+     {"name": "local", "provider": "fake", "tier": "cheap", "latency_ms": 20}]
+or, without a file, from OPENAI_API_KEY / OPENAI_BASE_URL / LLM_CHEAP_MODEL / LLM_STRONG_MODEL.
+LLM_PROVIDER=fake swaps everything for the deterministic local model (tests, benchmarks).
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import queue
+import threading
+import time
+from typing import Any
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, HumanMessage, ToolMessage
+from langchain_core.messages.ai import UsageMetadata
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.utils.function_calling import convert_to_openai_tool
+from pydantic import ConfigDict, Field, PrivateAttr
+
+from cancellation import submit
+
+LLM_PROVIDER = os.getenv("LLM_PROVIDER", "openai")
+LLM_ENDPOINTS_FILE = os.getenv("LLM_ENDPOINTS_FILE")
+LLM_CHEAP_MODEL = os.getenv("LLM_CHEAP_MODEL", "gpt-4o-mini")
+LLM_STRONG_MODEL = os.getenv("LLM_STRONG_MODEL", "")
+LLM_HEDGE_AFTER_MS = float(os.getenv("LLM_HEDGE_AFTER_MS", "2500"))
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "60"))
+LLM_BREAKER_FAILURES = int(os.getenv("LLM_BREAKER_FAILURES", "3"))
+LLM_BREAKER_COOLDOWN = float(os.getenv("LLM_BREAKER_COOLDOWN", "30"))
+LLM_COMPLEXITY_THRESHOLD = int(os.getenv("LLM_COMPLEXITY_THRESHOLD", "2"))
+LLM_FAKE_LATENCY_MS = float(os.getenv("LLM_FAKE_LATENCY_MS", "0"))
+
+EWMA_ALPHA = 0.2
+
+COMPLEX_KEYWORDS = [
+    "explain", "compare", "analyze", "analyse", "step by step", "why", "difference between",
+    "summarize", "summarise", "write code", "plan", "pros and cons",
+]
+
+# -------------------
+# Local stand-in model
+# -------------------
+class FakeChatModel(BaseChatModel):
+    """Deterministic local model: same input, same reply, no network."""
+
+    model_name: str = "fake"
+    latency_ms: float = LLM_FAKE_LATENCY_MS
+    token_latency_ms: float = 0.0
+    fail: bool = False  # always raise, to exercise failover and circuit breaking
+    # Prompt prefixes already seen, to report cached tokens like a provider-side prompt cache
+    _prefixes: set = PrivateAttr(default_factory=set)
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake"
+
+    def bind_tools(self, tools, *, tool_choice=None, **kwargs):
+        return self.bind(tools=[convert_to_openai_tool(t) for t in tools], **kwargs)
+
+    def _reply(self, messages) -> str:
+        if self.fail:
+            raise ConnectionError(f"{self.model_name} is unavailable")
+        last = next((m for m in reversed(messages) if isinstance(m, HumanMessage)), None)
+        text = last.content if last else ""
+        return f"I understand you said: {text[:200]}"
+
+    def _usage(self, messages, reply: str) -> UsageMetadata:
+        """Roughly 4 characters per token; the longest message prefix seen before counts as cached."""
+        prompt_tokens = cached = 0
+        digest = hashlib.sha256()
+        for message in messages:
+            digest.update(f"{message.type}:{message.content}\x00".encode("utf-8"))
+            prompt_tokens += len(str(message.content)) // 4 + 4
+            key = digest.hexdigest()
+            if key in self._prefixes:
+                cached = prompt_tokens
+            self._prefixes.add(key)
+        if len(self._prefixes) > 100_000:
+            self._prefixes.clear()
+        output_tokens = len(reply) // 4 + 1
+        return UsageMetadata(
+            input_tokens=prompt_tokens, output_tokens=output_tokens, total_tokens=prompt_tokens + output_tokens,
+            input_token_details={"cache_read": cached}
+        )
+
+    def _message(self, messages) -> AIMessage:
+        reply = self._reply(messages)
+        return AIMessage(content=reply, response_metadata={"model_name": self.model_name},
+                         usage_metadata=self._usage(messages, reply))
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        time.sleep(self.latency_ms / 1000)
+        return ChatResult(generations=[ChatGeneration(message=self._message(messages))])
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        await asyncio.sleep(self.latency_ms / 1000)
+        return ChatResult(generations=[ChatGeneration(message=self._message(messages))])
+
+    def _tokens(self, messages):
+        words = self._reply(messages).split(" ")
+        return [word if i == 0 else " " + word for i, word in enumerate(words)]
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        time.sleep(self.latency_ms / 1000)
+        for token in self._tokens(messages):
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=token))
+            if run_manager:
+                run_manager.on_llm_new_token(token, chunk=chunk)
+            yield chunk
+            time.sleep(self.token_latency_ms / 1000)
+        # Usage comes last, as with stream_usage on a real endpoint
+        yield ChatGenerationChunk(message=AIMessageChunk(content="", usage_metadata=self._usage(messages, self._reply(messages))))
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        await asyncio.sleep(self.latency_ms / 1000)
+        for token in self._tokens(messages):
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=token))
+            if run_manager:
+                await run_manager.on_llm_new_token(token, chunk=chunk)
+            yield chunk
+            await asyncio.sleep(self.token_latency_ms / 1000)
+        yield ChatGenerationChunk(message=AIMessageChunk(content="", usage_metadata=self._usage(messages, self._reply(messages))))
+
+# -------------------
+# Endpoints & circuit breaking
+# -------------------
+class Endpoint:
+    """One model on one provider, with its own circuit breaker and latency estimate."""
+
+    def __init__(self, name: str, model: BaseChatModel, tier: str = "cheap"):
+        self.name = name
+        self.model = model
+        self.tier = tier
+        self.lock = threading.Lock()
+        self.consecutive_failures = 0
+        self.opened_at = None
+        # When the single half-open trial request started (None: no trial running)
+        self.trial_started_at = None
+        self.latency_ms = None
+        self.requests = 0
+        self.errors = 0
+
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= LLM_BREAKER_COOLDOWN:
+            return "half_open"
+        return "open"
+
+    def admit(self) -> bool:
+        """
+        Whether a request may start now. A half-open endpoint lets one trial request
+        through and refuses the rest until it succeeds or fails (or LLM_TIMEOUT passes).
+        """
+        with self.lock:
+            if self.state() != "half_open":
+                return True
+            now = time.monotonic()
+            if self.trial_started_at is not None and now - self.trial_started_at < LLM_TIMEOUT:
+                return False
+            self.trial_started_at = now
+            return True
+
+    def record_success(self, latency_ms: float):
+        with self.lock:
+            self.requests += 1
+            self.consecutive_failures = 0
+            self.opened_at = None
+            self.trial_started_at = None
+            if self.latency_ms is None:
+                self.latency_ms = latency_ms
+            else:
+                self.latency_ms += EWMA_ALPHA * (latency_ms - self.latency_ms)
+
+    def record_slow(self, latency_ms: float):
+        """A hedged-away attempt: count the time it had already taken as a latency sample."""
+        with self.lock:
+            self.trial_started_at = None
+            if self.latency_ms is None:
+                self.latency_ms = latency_ms
+            elif latency_ms > self.latency_ms:
+                self.latency_ms += EWMA_ALPHA * (latency_ms - self.latency_ms)
+
+    def record_failure(self):
+        with self.lock:
+            self.requests += 1
+            self.errors += 1
+            self.consecutive_failures += 1
+            self.trial_started_at = None
+            if self.consecutive_failures >= LLM_BREAKER_FAILURES or self.opened_at is not None:
+                # Trip, or re-open after a failed half-open trial
+                self.opened_at = time.monotonic()
+
+    async def aprobe(self):
+        """Cheapest reachability check: list models on OpenAI-compatible APIs, else a tiny call."""
+        client = getattr(self.model, "root_async_client", None)
+        if client is not None:
+            await client.models.list()
+        else:
+            await self.model.ainvoke("ping")
+
+    def stats(self) -> dict:
+        return {
+            "name": self.name,
+            "tier": self.tier,
+            "state": self.state(),
+            "latency_ms_ewma": round(self.latency_ms, 1) if self.latency_ms is not None else None,
+            "requests": self.requests,
+            "errors": self.errors,
+        }
+
+def estimate_complexity(messages) -> int:
+    """Cheap heuristic score; LLM_COMPLEXITY_THRESHOLD or more goes to the strong tier."""
+    last = next((m for m in reversed(messages) if isinstance(m, HumanMessage)), None)
+    text = (last.content if last and isinstance(last.content, str) else "").lower()
+    score = min(len(text) // 300, 2)
+    if any(keyword in text for keyword in COMPLEX_KEYWORDS):
+        score += 2
+    if len(messages) > 20:
+        score += 1
+    if messages and isinstance(messages[-1], ToolMessage):
+        score += 1  # summarizing tool output
+    return score
+
+# -------------------
+# Router
+# -------------------
+class LLMRouter(BaseChatModel):
+    """A chat model that spreads each call over several endpoints."""
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    endpoints: list = Field(default_factory=list)
+    hedge_after_ms: float = LLM_HEDGE_AFTER_MS
+    complexity_threshold: int = LLM_COMPLEXITY_THRESHOLD
+    counters: dict = Field(default_factory=lambda: {"calls": 0, "strong": 0, "hedges": 0, "hedge_wins": 0, "failovers": 0})
+    _lock: threading.Lock = PrivateAttr(default_factory=threading.Lock)
+
+    @property
+    def _llm_type(self) -> str:
+        return "llm-router"
+
+    def bind_tools(self, tools, *, tool_choice=None, **kwargs):
+        # Fixed order, so the tool definitions are byte-identical on every request (prompt caching)
+        formatted = sorted((convert_to_openai_tool(t) for t in tools), key=lambda t: t["function"]["name"])
+        if tool_choice is not None:
+            kwargs["tool_choice"] = tool_choice
+        return self.bind(tools=formatted, **kwargs)
+
+    def _count(self, *names: str):
+        with self._lock:
+            for name in names:
+                self.counters[name] += 1
+
+    def _candidates(self, messages) -> list:
+        """Endpoints to try, in order: wanted tier first, healthy before half-open, fastest first."""
+        tier = "strong" if estimate_complexity(messages) >= self.complexity_threshold else "cheap"
+        self._count("calls", *(["strong"] if tier == "strong" else []))
+
+        state_rank = {"closed": 0, "half_open": 1, "open": 2}
+
+        def rank(endpoint):
+            return (
+                endpoint.tier != tier,
+                state_rank[endpoint.state()],
+                endpoint.latency_ms if endpoint.latency_ms is not None else 0.0,
+            )
+
+        ordered = sorted(self.endpoints, key=rank)
+        available = [e for e in ordered if e.state() != "open"]
+        # Everything open: try anyway rather than fail without a request
+        return available or ordered
+
+    @staticmethod
+    def _admit_next(pending: list) -> Endpoint | None:
+        """Pop the next candidate that admits a request (skipping half-open ones mid-trial)."""
+        while pending:
+            endpoint = pending.pop(0)
+            if endpoint.admit():
+                return endpoint
+        return None
+
+    @staticmethod
+    def _unavailable(candidates) -> RuntimeError:
+        names = ", ".join(endpoint.name for endpoint in candidates)
+        return RuntimeError(f"No LLM endpoint available ({names}: half-open trial in progress)")
+
+    def _settle(self, launched: list, failed: set, winner: int, hedge_index: int | None):
+        """Book-keeping once a race has a winner."""
+        now = time.perf_counter()
+        for index, (endpoint, started) in enumerate(launched):
+            if index != winner and index not in failed:
+                endpoint.record_slow((now - started) * 1000)
+        if winner == hedge_index:
+            self._count("hedge_wins")
+
+    # Sync: each attempt runs in its own thread and reports into one queue
+    def _race(self, candidates, start_attempt):
+        """Yield items from the first attempt to produce one; hedge and fail over as needed."""
+        results = queue.Queue()
+        stops = {}
+        launched = []
+        failed = set()
+        pending = list(candidates)
+
+        def launch() -> bool:
+            endpoint = self._admit_next(pending)
+            if endpoint is None:
+                return False
+            index = len(stops)
+            stops[index] = threading.Event()
+            started = time.perf_counter()
+            launched.append((endpoint, started))
+
+            def run(stop=stops[index]):
+                first = True
+                try:
+                    iterator = start_attempt(endpoint)
+                    try:
+                        for item in iterator:
+                            if stop.is_set():
+                                return
+                            if first:
+                                endpoint.record_success((time.perf_counter() - started) * 1000)
+                                first = False
+                            results.put((index, "item", item))
+                    finally:
+                        close = getattr(iterator, "close", None)
+                        if close:
+                            close()
+                    results.put((index, "done", None))
+                except Exception as e:
+                    if first:
+                        endpoint.record_failure()
+                    results.put((index, "error", e))
+
+            threading.Thread(target=run, name=f"llm-{endpoint.name}", daemon=True).start()
+            return True
+
+        if not launch():
+            raise self._unavailable(candidates)
+        hedge_at = time.monotonic() + self.hedge_after_ms / 1000
+        hedge_index = None
+        running = 1
+        winner = None
+
+        while winner is None:
+            timeout = None
+            if pending and hedge_at is not None:
+                timeout = max(0.0, hedge_at - time.monotonic())
+            try:
+                index, kind, payload = results.get(timeout=timeout)
+            except queue.Empty:
+                hedge_at = None
+                if launch():
+                    hedge_index = len(launched) - 1
+                    self._count("hedges")
+                    running += 1
+                continue
+
+            if kind == "error":
+                running -= 1
+                failed.add(index)
+                if launch():
+                    self._count("failovers")
+                    running += 1
+                elif running == 0:
+                    raise payload
+                continue
+
+            winner = index
+
+        for index, stop in stops.items():
+            if index != winner:
+                stop.set()
+        self._settle(launched, failed, winner, hedge_index)
+
+        while True:
+            if kind == "item":
+                yield payload
+            elif kind == "done":
+                return
+            else:
+                raise payload
+            index, kind, payload = results.get()
+            while index != winner:
+                index, kind, payload = results.get()
+
+    # Async: one task per attempt; losers are cancelled, which aborts their requests
+    async def _arace(self, candidates, start_attempt):
+        results = asyncio.Queue()
+        tasks = []
+        launched = []
+        failed = set()
+        pending = list(candidates)
+
+        def launch() -> bool:
+            endpoint = self._admit_next(pending)
+            if endpoint is None:
+                return False
+            index = len(tasks)
+            started = time.perf_counter()
+            launched.append((endpoint, started))
+
+            async def run():
+                first = True
+                try:
+                    async for item in start_attempt(endpoint):
+                        if first:
+                            endpoint.record_success((time.perf_counter() - started) * 1000)
+                            first = False
+                        await results.put((index, "item", item))
+                    await results.put((index, "done", None))
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    if first:
+                        endpoint.record_failure()
+                    await results.put((index, "error", e))
+
+            tasks.append(asyncio.create_task(run()))
+            return True
+
+        if not launch():
+            raise self._unavailable(candidates)
+        hedge_at = time.monotonic() + self.hedge_after_ms / 1000
+        hedge_index = None
+        running = 1
+        winner = None
+
+        try:
+            while winner is None:
+                timeout = None
+                if pending and hedge_at is not None:
+                    timeout = max(0.0, hedge_at - time.monotonic())
+                try:
+                    index, kind, payload = await asyncio.wait_for(results.get(), timeout)
+                except asyncio.TimeoutError:
+                    hedge_at = None
+                    if launch():
+                        hedge_index = len(launched) - 1
+                        self._count("hedges")
+                        running += 1
+                    continue
+
+                if kind == "error":
+                    running -= 1
+                    failed.add(index)
+                    if launch():
+                        self._count("failovers")
+                        running += 1
+                    elif running == 0:
+                        raise payload
+                    continue
+
+                winner = index
+
+            for index, task in enumerate(tasks):
+                if index != winner:
+                    task.cancel()
+            self._settle(launched, failed, winner, hedge_index)
+
+            while True:
+                if kind == "item":
+                    yield payload
+                elif kind == "done":
+                    return
+                else:
+                    raise payload
+                index, kind, payload = await results.get()
+                while index != winner:
+                    index, kind, payload = await results.get()
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        def attempt(endpoint):
+            return iter([endpoint.model._generate(messages, stop=stop, **kwargs)])
+
+        return next(self._race(self._candidates(messages), attempt))
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        async def attempt(endpoint):
+            yield await endpoint.model._agenerate(messages, stop=stop, **kwargs)
+
+        race = self._arace(self._candidates(messages), attempt)
+        try:
+            return await race.__anext__()
+        finally:
+            await race.aclose()
+
+    # Children stream without our run_manager so a losing hedge never emits tokens;
+    # only the winner's chunks are reported.
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        def attempt(endpoint):
+            return endpoint.model._stream(messages, stop=stop, **kwargs)
+
+        for chunk in self._race(self._candidates(messages), attempt):
+            if run_manager:
+                run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+            yield chunk
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        def attempt(endpoint):
+            return endpoint.model._astream(messages, stop=stop, **kwargs)
+
+        race = self._arace(self._candidates(messages), attempt)
+        try:
+            async for chunk in race:
+                if run_manager:
+                    await run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+                yield chunk
+        finally:
+            await race.aclose()
+
+    async def aprobe(self) -> bool:
+        """Probe every endpoint; healthy if at least one answers.
+        Runs on the background LLM loop, which owns the endpoints' async HTTP clients."""
+        return await asyncio.wrap_future(submit(self._aprobe))
+
+    async def _aprobe(self) -> bool:
+        results = await asyncio.gather(*(e.aprobe() for e in self.endpoints), return_exceptions=True)
+        errors = [r for r in results if isinstance(r, BaseException)]
+        if errors and len(errors) == len(results):
+            raise errors[0]
+        return True
+
+    def stats(self) -> dict:
+        with self._lock:
+            counters = dict(self.counters)
+        return {
+            **counters,
+            "hedge_after_ms": self.hedge_after_ms,
+            "endpoints": [endpoint.stats() for endpoint in self.endpoints],
+        }
+
+# -------------------
+# Construction
+# -------------------
+def build_endpoint(config: dict) -> Endpoint:
+    provider = config.get("provider", "openai")
+    if provider == "fake":
+        model = FakeChatModel(
+            model_name=config.get("name", "fake"),
+            latency_ms=config.get("latency_ms", LLM_FAKE_LATENCY_MS),
+            token_latency_ms=config.get("token_latency_ms", 0.0),
+            fail=config.get("fail", False)
+        )
+    elif provider == "openai":
+        from langchain_openai import ChatOpenAI
+
+        api_key_env = config.get("api_key_env", "OPENAI_API_KEY")
+        api_key = os.getenv(api_key_env)
+        if not api_key:
+            # Calls will fail (and trip the breaker) instead of crashing at import
+            print(f"⚠️ {api_key_env} is not set; LLM endpoint {config.get('name', provider)!r} will fail")
+        model = ChatOpenAI(
+            model=config["model"],
+            base_url=config.get("base_url") or os.getenv("OPENAI_BASE_URL"),
+            api_key=api_key or "not-set",
+            timeout=config.get("timeout", LLM_TIMEOUT),
+            max_retries=config.get("max_retries", 1),
+            stream_usage=True  # report (cached) prompt tokens on streamed responses too
+        )
+    else:
+        raise ValueError(f"Unknown LLM provider: {provider!r}")
+    return Endpoint(config.get("name", provider), model, config.get("tier", "cheap"))
+
+def endpoint_configs() -> list:
+    if LLM_PROVIDER == "fake":
+        return [{"name": "local-fake", "provider": "fake"}]
+    if LLM_ENDPOINTS_FILE:
+        with open(LLM_ENDPOINTS_FILE, encoding="utf-8") as f:
+            return json.load(f)
+    configs = [{"name": "openai-cheap", "model": LLM_CHEAP_MODEL, "tier": "cheap"}]
+    if LLM_STRONG_MODEL:
+        configs.append({"name": "openai-strong", "model": LLM_STRONG_MODEL, "tier": "strong"})
+    return configs
+
+def build_router(configs: list | None = None, **kwargs: Any) -> LLMRouter:
+    configs = endpoint_configs() if configs is None else configs
+    return LLMRouter(endpoints=[build_endpoint(c) for c in configs], **kwargs)
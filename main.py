@@ -1,15 +1,51 @@
-from fastapi import FastAPI, HTTPException, status
+from fastapi import APIRouter, Depends, FastAPI, HTTPException, Request, WebSocket, WebSocketDisconnect, status
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 from typing import List, Optional, Dict, Any
 from langchain_core.messages import HumanMessage, AIMessage
 import uuid
-from langgraph_tool_backend import chatbot, KNOWLEDGE_BASE, PROFANITY_LIST, llm
-from fastapi.responses import StreamingResponse, JSONResponse,FileResponse
+from langgraph_tool_backend import (
+    chatbot, checkpointer, KNOWLEDGE_BASE, PROFANITY_LIST, llm, search_tool, output_guard, tenant_registry,
+    explain_route, validate_input, check_knowledge_base, enqueue_booking_confirmation, user_message, DB_PATH
+)
+from tenants import Tenant, TenantError, InvalidAPIKeyError, InvalidThreadIdError
+from health import HealthMonitor, Probe, utc_now
+from prompts import prompt_manager
+from limits import RequestLimitMiddleware, memory_ledger, MAX_BODY_BYTES, MAX_IMPORT_LINE_BYTES
+from static_assets import CompressionMiddleware, ENCODINGS, asset_store, compression_stats
+from corpus import corpus_recorder
+from routing_rules import rule_store
+from node_pool import start_pool, shutdown_pool
+from jobs import job_queue
+from booking_index import current_index
+from speculation import speculator
+from starlette.concurrency import run_in_threadpool, iterate_in_threadpool
+from cancellation import CancelScope, current_scope
+from starlette.background import BackgroundTask
+from tracing import TracingMiddleware, request_trace, traced_config, tracer, render_waterfall
+from conversation_export import iter_conversations, iter_ndjson, write_parquet, read_ndjson, import_conversations
+import asyncio
+import hmac
+import os
+import tempfile
+import time
+from fastapi.responses import StreamingResponse, JSONResponse,FileResponse, PlainTextResponse
 import json
 
+IMPORT_BATCH_SIZE = 100
+WS_PING_INTERVAL = float(os.getenv("WS_PING_INTERVAL", "20"))
+WS_IDLE_TIMEOUT = float(os.getenv("WS_IDLE_TIMEOUT", "60"))
+# Credential for the /admin routes (X-Admin-Key); they are refused while it is unset
+ADMIN_API_KEY = os.getenv("ADMIN_API_KEY", "")
+
 app = FastAPI(title="LangGraph Chatbot API")
 
+# Body size limits and per-request memory accounting (innermost, so 413s still get CORS headers)
+app.add_middleware(RequestLimitMiddleware)
+
+# Compresses (and ETags) the JSON history endpoints above a size threshold
+app.add_middleware(CompressionMiddleware)
+
 # Enable CORS
 app.add_middleware(
     CORSMiddleware,
@@ -17,66 +53,83 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Trace-Id", "traceparent"],
 )
 
-# **************************************** Health Check State *************************
+# Request tracing (spans recorded for TRACE_SAMPLE_RATIO of requests)
+app.add_middleware(TracingMiddleware)
 
-class HealthStatus:
-    def __init__(self):
-        self.nlu_initialized = False
-        self.knowledge_base_loaded = False
-        self.ethical_filter_active = False
-    
-    def is_healthy(self) -> bool:
-        return (
-            self.nlu_initialized and 
-            self.knowledge_base_loaded and 
-            self.ethical_filter_active
-        )
-    
-    def get_status(self) -> Dict[str, Any]:
-        return {
-            "nlu_initialized": self.nlu_initialized,
-            "knowledge_base_loaded": self.knowledge_base_loaded,
-            "ethical_filter_active": self.ethical_filter_active,
-            "overall_health": "healthy" if self.is_healthy() else "unhealthy"
-        }
+# **************************************** Health Check State *************************
 
-health_status = HealthStatus()
+HEALTH_LLM_PROBE_INTERVAL = float(os.getenv("HEALTH_LLM_PROBE_INTERVAL", "60"))
+HEALTH_SEARCH_PROBE_INTERVAL = float(os.getenv("HEALTH_SEARCH_PROBE_INTERVAL", "300"))
+# The job queue is reported failed while its oldest due job has waited longer than this
+HEALTH_JOB_LAG_SECONDS = float(os.getenv("HEALTH_JOB_LAG_SECONDS", "60"))
+
+health_monitor = HealthMonitor()
+
+# Critical probes decide readiness; the search tool only degrades the status
+health_monitor.add_probe(Probe(
+    "nlu_module", llm.aprobe, interval=HEALTH_LLM_PROBE_INTERVAL
+))
+health_monitor.add_probe(Probe(
+    "checkpointer", lambda: checkpointer.get_tuple({'configurable': {'thread_id': '__health__'}}) or True
+))
+health_monitor.add_probe(Probe(
+    "knowledge_base", lambda: len(KNOWLEDGE_BASE) > 0 and check_knowledge_base(next(iter(KNOWLEDGE_BASE))) is not None
+))
+health_monitor.add_probe(Probe(
+    "ethical_filter", lambda: len(PROFANITY_LIST) > 0 and validate_input(PROFANITY_LIST[0])[0] is False
+))
+health_monitor.add_probe(Probe(
+    "search_tool", lambda: search_tool.invoke("health check") or True,
+    interval=HEALTH_SEARCH_PROBE_INTERVAL, timeout=10, critical=False
+))
+health_monitor.add_probe(Probe(
+    "job_queue", lambda: (job_queue.running or job_queue.workers == 0) and job_queue.stats()["lag_seconds"] < HEALTH_JOB_LAG_SECONDS,
+    critical=False
+))
 
 @app.get("/healthz")
 async def health_check():
     """
-    Health check endpoint for monitoring and load balancers
+    Health check endpoint for monitoring and load balancers.
+    Serves the monitor's cached report; no dependency is touched here.
     Returns:
-        - 200 OK: All systems operational
-        - 503 Service Unavailable: One or more systems failed
+        - 200 OK: healthy, or degraded (a non-critical component failed)
+        - 503 Service Unavailable: a critical component failed
     """
-    health_data = health_status.get_status()
-    is_healthy = health_status.is_healthy()
+    report = health_monitor.report
     
-    response = {
-        "status": "healthy" if is_healthy else "unhealthy",
-        "timestamp": "2025-11-02T00:00:00Z",  # Add actual timestamp if needed
-        "components": {
-            "nlu_module": {
-                "status": "operational" if health_data["nlu_initialized"] else "failed",
-                "initialized": health_data["nlu_initialized"]
-            },
-            "knowledge_base": {
-                "status": "loaded" if health_data["knowledge_base_loaded"] else "not_loaded",
-                "loaded": health_data["knowledge_base_loaded"]
-            },
-            "ethical_filter": {
-                "status": "active" if health_data["ethical_filter_active"] else "inactive",
-                "active": health_data["ethical_filter_active"]
-            }
-        }
-    }
+    return JSONResponse(
+        status_code=200 if report["ready"] else 503,
+        content={**report, "timestamp": utc_now()}
+    )
+
+@app.get("/livez")
+async def liveness_check():
+    """
+    Liveness: the worker's event loop is serving and the health monitor is alive
+    """
+    if not health_monitor.running:
+        return JSONResponse(status_code=503, content={"status": "dead", "timestamp": utc_now()})
+    return {"status": "alive", "timestamp": utc_now()}
+
+@app.get("/readyz")
+async def readiness_check():
+    """
+    Readiness: every critical dependency passed its recent probes
+    """
+    report = health_monitor.report
+    ready = report["ready"] and health_monitor.running
     
     return JSONResponse(
-        status_code=200 if is_healthy else 503,
-        content=response
+        status_code=200 if ready else 503,
+        content={
+            "status": "ready" if ready else "not_ready",
+            "timestamp": utc_now(),
+            "failed": [name for name, c in report["components"].items() if c["critical"] and not c["healthy"]]
+        }
     )
 
 # **************************************** Startup Event *************************
@@ -84,36 +137,42 @@ async def health_check():
 @app.on_event("startup")
 async def startup_event():
     """Initialize all components on startup"""
-    try:
-        # 1. Check NLU Module (LLM) initialization
-        test_response = llm.invoke("test")
-        if test_response:
-            health_status.nlu_initialized = True
-            print("✓ NLU module initialized")
-        
-        # 2. Check Knowledge Base loaded
-        if KNOWLEDGE_BASE and len(KNOWLEDGE_BASE) > 0:
-            health_status.knowledge_base_loaded = True
-            print(f"✓ Knowledge base loaded ({len(KNOWLEDGE_BASE)} entries)")
-        
-        # 3. Check Ethical Filter (Profanity List) active
-        if PROFANITY_LIST and len(PROFANITY_LIST) > 0:
-            health_status.ethical_filter_active = True
-            print(f"✓ Ethical filter active ({len(PROFANITY_LIST)} words)")
-        
-        # Verify chatbot graph is compiled
-        if chatbot:
-            print("✓ Chatbot graph compiled")
-        
-        if health_status.is_healthy():
-            print("\n🎉 All systems operational!")
+    # Start the node pool first, so its workers are warm before traffic arrives
+    if start_pool():
+        print("✓ Node process pool started")
+    
+    if job_queue.start():
+        print(f"✓ {job_queue.workers} background job workers started")
+    
+    if "br" not in ENCODINGS:
+        print("⚠️ brotli is not installed; UI assets and JSON responses are compressed with gzip only")
+    
+    # First probe round before serving, then keep probing in the background
+    await health_monitor.run_all()
+    health_monitor.start()
+    
+    report = health_monitor.report
+    for name, component in report["components"].items():
+        if component["healthy"]:
+            print(f"✓ {name} operational ({component['latency_ms']} ms)")
         else:
-            print("\n⚠️ Warning: Some systems failed to initialize")
-            print(health_status.get_status())
-            
-    except Exception as e:
-        print(f"❌ Startup error: {e}")
-        health_status.nlu_initialized = False
+            print(f"❌ {name} failed: {component['last_error']}")
+    
+    # Verify chatbot graph is compiled
+    if chatbot:
+        print("✓ Chatbot graph compiled")
+    
+    if report["status"] == "healthy":
+        print("\n🎉 All systems operational!")
+    else:
+        print(f"\n⚠️ Warning: status is {report['status']}")
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop background work and release worker processes on shutdown"""
+    await health_monitor.stop()
+    await run_in_threadpool(job_queue.stop)
+    shutdown_pool()
 
 # **************************************** Models *************************
 
@@ -140,8 +199,52 @@ class StreamRequest(BaseModel):
     message: str
     thread_id: str
 
+class RouteExplainRequest(BaseModel):
+    message: str
+    thread_id: Optional[str] = None
+    in_booking_flow: bool = False
+
 # **************************************** Utility Functions *************************
 
+def resolve_tenant(headers, query_params=None) -> Tenant:
+    """
+    Tenant selected by API key (X-API-Key or Authorization: Bearer); no key
+    means the default tenant. X-Tenant-ID must agree with the key.
+    """
+    api_key = headers.get("x-api-key")
+    authorization = headers.get("authorization", "")
+    if not api_key and authorization.lower().startswith("bearer "):
+        api_key = authorization[7:].strip()
+    tenant_id = headers.get("x-tenant-id")
+    if query_params is not None:
+        # Browsers cannot set headers on a WebSocket handshake
+        api_key = api_key or query_params.get("api_key")
+        tenant_id = tenant_id or query_params.get("tenant")
+    try:
+        return tenant_registry.resolve(api_key, tenant_id)
+    except InvalidAPIKeyError as e:
+        raise HTTPException(status_code=401, detail=str(e))
+    except TenantError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+def scoped_thread_id(tenant: Tenant, thread_id: str) -> str:
+    """Checkpoint key of a client thread id within the tenant (400 if the id is not allowed)"""
+    try:
+        return tenant.thread_id(thread_id)
+    except InvalidThreadIdError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+def require_admin(request: Request):
+    """
+    Admin credential (X-Admin-Key) check for the /admin routes and bulk
+    export/import; fails closed with 403 when ADMIN_API_KEY is not configured
+    """
+    if not ADMIN_API_KEY:
+        raise HTTPException(status_code=403, detail="Admin API is disabled (ADMIN_API_KEY is not set)")
+    supplied = request.headers.get("x-admin-key", "")
+    if not hmac.compare_digest(supplied.encode(), ADMIN_API_KEY.encode()):
+        raise HTTPException(status_code=401, detail="Invalid or missing X-Admin-Key")
+
 def generate_thread_id() -> str:
     """Generate a unique thread ID"""
     return str(uuid.uuid4())
@@ -173,20 +276,39 @@ def load_conversation(thread_id: str) -> List[Dict[str, str]]:
 # **************************************** API Endpoints *************************
 
 @app.get("/")
-async def root():
-    """Health check endpoint"""
-    return FileResponse("index.html")
+async def root(request: Request):
+    """
+    Chat UI, precompressed; revalidated by ETag on every load
+    """
+    asset = asset_store.get("/")
+    if asset is None:
+        raise HTTPException(status_code=404, detail="UI not found")
+    return asset.response(request.headers)
+
+@app.get("/static/{name}")
+async def static_asset(name: str, request: Request):
+    """
+    UI assets; content-hashed names (as linked from the UI) are cached as immutable
+    """
+    asset = asset_store.get(f"/static/{name}")
+    if asset is None:
+        raise HTTPException(status_code=404, detail="Asset not found")
+    return asset.response(request.headers)
+
 @app.post("/chat", response_model=ChatResponse)
-async def chat(request: ChatRequest):
+async def chat(request: ChatRequest, http_request: Request):
     """
     Send a message and get a response
     """
+    tenant = resolve_tenant(http_request.headers)
+    thread_key = scoped_thread_id(tenant, request.thread_id)
     try:
-        config = {'configurable': {'thread_id': request.thread_id}}
+        config = corpus_recorder.config(traced_config({'configurable': {'thread_id': thread_key}}))
         
-        # Invoke the chatbot
-        response = chatbot.invoke(
-            {"messages": [HumanMessage(content=request.message)]},
+        # Invoke the chatbot off the event loop
+        response = await run_in_threadpool(
+            chatbot.invoke,
+            {"messages": [user_message(request.message)], "tenant_id": tenant.id},
             config=config
         )
         
@@ -200,6 +322,9 @@ async def chat(request: ChatRequest):
         if ai_message is None:
             raise HTTPException(status_code=500, detail="No response generated")
         
+        # The turn is checkpointed once invoke returns
+        await run_in_threadpool(enqueue_booking_confirmation, response, tenant.id)
+        
         return ChatResponse(
             message=ai_message,
             thread_id=request.thread_id
@@ -209,26 +334,47 @@ async def chat(request: ChatRequest):
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/chat/stream")
-async def chat_stream(request: StreamRequest):
+async def chat_stream(request: StreamRequest, http_request: Request):
     """
     Stream chat responses token by token
     """
-    async def generate():
+    tenant = resolve_tenant(http_request.headers)
+    thread_key = scoped_thread_id(tenant, request.thread_id)
+    
+    # A sync generator: StreamingResponse iterates it in the threadpool,
+    # so graph execution never blocks the event loop
+    def generate():
         try:
-            config = {'configurable': {'thread_id': request.thread_id}}
+            config = corpus_recorder.config(traced_config({'configurable': {'thread_id': thread_key}}))
+            # Holds back at most a partial word that could be a filtered term
+            redactor = tenant.output_guard.stream()
+            values = {}
             
-            for message_chunk, metadata in chatbot.stream(
-                {"messages": [HumanMessage(content=request.message)]},
+            for mode, chunk in chatbot.stream(
+                {"messages": [user_message(request.message)], "tenant_id": tenant.id},
                 config=config,
-                stream_mode="messages"
+                stream_mode=["messages", "values"]
             ):
+                if mode == "values":
+                    values = chunk
+                    continue
+                message_chunk, metadata = chunk
                 if isinstance(message_chunk, AIMessage):
                     # Send only assistant tokens
-                    chunk_data = {
-                        "type": "token",
-                        "content": message_chunk.content
-                    }
-                    yield f"data: {json.dumps(chunk_data)}\n\n"
+                    content = redactor.feed(message_chunk.content, message_chunk.id)
+                    if content:
+                        chunk_data = {
+                            "type": "token",
+                            "content": content
+                        }
+                        yield f"data: {json.dumps(chunk_data)}\n\n"
+            
+            content = redactor.flush()
+            if content:
+                yield f"data: {json.dumps({'type': 'token', 'content': content})}\n\n"
+            
+            # The stream ends after the turn's checkpoint is written
+            enqueue_booking_confirmation(values, tenant.id)
             
             # Send end signal
             yield f"data: {json.dumps({'type': 'end'})}\n\n"
@@ -242,6 +388,145 @@ async def chat_stream(request: StreamRequest):
     
     return StreamingResponse(generate(), media_type="text/event-stream")
 
+@app.websocket("/ws")
+async def websocket_chat(websocket: WebSocket):
+    """
+    Persistent chat connection that multiplexes several threads.
+    
+    Client → server:
+        {"type": "chat", "thread_id": "...", "message": "..."}
+        {"type": "cancel", "thread_id": "..."}   abort the thread's in-flight turn
+        {"type": "ping"} / {"type": "pong"}
+    Server → client:
+        {"type": "token" | "end" | "cancelled" | "error", "thread_id": "...", ...}
+        {"type": "ping"} every WS_PING_INTERVAL seconds; the socket is closed
+        after WS_IDLE_TIMEOUT seconds without any client message
+    
+    The tenant is chosen once per connection (headers, or ?api_key= / ?tenant=).
+    """
+    try:
+        tenant = resolve_tenant(websocket.headers, websocket.query_params)
+    except HTTPException:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+    
+    await websocket.accept()
+    send_lock = asyncio.Lock()
+    turns: Dict[str, CancelScope] = {}
+    tasks = set()
+    last_seen = time.monotonic()
+    
+    async def send(data: dict):
+        async with send_lock:
+            await websocket.send_text(json.dumps(data))
+    
+    async def run_turn(thread_id: str, thread_key: str, message: str, scope: CancelScope):
+        # Runs in its own task context, so the scope reaches the graph's LLM calls,
+        # and each turn gets its own trace (the socket never passes the HTTP middleware)
+        current_scope.set(scope)
+        with request_trace("WS chat", websocket.headers.get("traceparent"), {"http.target": "/ws", "ws.type": "chat"}):
+            await stream_turn(thread_id, thread_key, message, scope)
+    
+    async def stream_turn(thread_id: str, thread_key: str, message: str, scope: CancelScope):
+        stream = chatbot.stream(
+            {"messages": [user_message(message)], "tenant_id": tenant.id},
+            config=corpus_recorder.config(traced_config({'configurable': {'thread_id': thread_key}})),
+            stream_mode=["messages", "values"]
+        )
+        redactor = tenant.output_guard.stream()
+        values = {}
+        try:
+            async for mode, chunk in iterate_in_threadpool(stream):
+                if scope.cancelled:
+                    break
+                if mode == "values":
+                    values = chunk
+                    continue
+                message_chunk, metadata = chunk
+                if isinstance(message_chunk, AIMessage):
+                    content = redactor.feed(message_chunk.content, message_chunk.id)
+                    if content:
+                        await send({"type": "token", "thread_id": thread_id, "content": content})
+            
+            content = redactor.flush()
+            if content and not scope.cancelled:
+                await send({"type": "token", "thread_id": thread_id, "content": content})
+            
+            # Only a turn that ran to the end (and so was checkpointed) confirms its booking
+            if not scope.cancelled:
+                await run_in_threadpool(enqueue_booking_confirmation, values, tenant.id)
+            
+            await send({"type": "cancelled" if scope.cancelled else "end", "thread_id": thread_id})
+        except Exception as e:
+            if scope.cancelled:
+                await send({"type": "cancelled", "thread_id": thread_id})
+            else:
+                await send({"type": "error", "thread_id": thread_id, "content": str(e)})
+        finally:
+            turns.pop(thread_id, None)
+            try:
+                await run_in_threadpool(stream.close)
+            except ValueError:
+                pass  # still executing in the threadpool; it stops at the next chunk
+    
+    async def ping():
+        while True:
+            await asyncio.sleep(WS_PING_INTERVAL)
+            if time.monotonic() - last_seen > WS_IDLE_TIMEOUT:
+                await websocket.close(code=1001)
+                return
+            await send({"type": "ping"})
+    
+    pinger = asyncio.create_task(ping())
+    try:
+        while True:
+            raw = await websocket.receive_text()
+            last_seen = time.monotonic()
+            
+            # Same limit as HTTP bodies, checked before parsing
+            if len(raw) > MAX_BODY_BYTES:
+                await send({"type": "error", "content": f"Message exceeds {MAX_BODY_BYTES} bytes"})
+                continue
+            
+            try:
+                data = json.loads(raw)
+                kind = data["type"]
+            except (ValueError, KeyError, TypeError):
+                await send({"type": "error", "content": "Invalid message"})
+                continue
+            
+            thread_id = data.get("thread_id")
+            
+            if kind == "ping":
+                await send({"type": "pong"})
+            elif kind == "cancel":
+                if thread_id in turns:
+                    turns[thread_id].cancel()
+            elif kind == "chat":
+                message = data.get("message")
+                if not isinstance(thread_id, str) or not isinstance(message, str):
+                    await send({"type": "error", "thread_id": thread_id, "content": "chat needs thread_id and message"})
+                elif thread_id in turns:
+                    await send({"type": "error", "thread_id": thread_id, "content": "A turn is already running on this thread"})
+                else:
+                    try:
+                        thread_key = tenant.thread_id(thread_id)
+                    except InvalidThreadIdError as e:
+                        await send({"type": "error", "thread_id": thread_id, "content": str(e)})
+                        continue
+                    turns[thread_id] = CancelScope()
+                    task = asyncio.create_task(run_turn(thread_id, thread_key, message, turns[thread_id]))
+                    tasks.add(task)
+                    task.add_done_callback(tasks.discard)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        pinger.cancel()
+        for scope in list(turns.values()):
+            scope.cancel()
+        for task in list(tasks):
+            task.cancel()
+
 @app.post("/thread/new", response_model=ThreadResponse)
 async def create_new_thread():
     """
@@ -251,11 +536,12 @@ async def create_new_thread():
     return ThreadResponse(thread_id=thread_id)
 
 @app.get("/thread/{thread_id}/history", response_model=ConversationHistory)
-async def get_thread_history(thread_id: str):
+async def get_thread_history(thread_id: str, request: Request):
     """
     Get conversation history for a specific thread
     """
-    messages = load_conversation(thread_id)
+    tenant = resolve_tenant(request.headers)
+    messages = load_conversation(scoped_thread_id(tenant, thread_id))
     
     formatted_messages = [
         ChatMessage(role=msg['role'], content=msg['content']) 
@@ -289,22 +575,277 @@ async def delete_thread(thread_id: str):
     return {"message": f"Thread {thread_id} deletion requested (not implemented)"}
 
 @app.get("/thread/{thread_id}/booking-history")
-async def get_booking_history(thread_id: str):
+async def get_booking_history(thread_id: str, request: Request):
     """
     Get booking history for a specific thread
     """
+    tenant = resolve_tenant(request.headers)
+    thread_key = scoped_thread_id(tenant, thread_id)
     try:
-        state = chatbot.get_state(config={'configurable': {'thread_id': thread_id}})
+        state = chatbot.get_state(config={'configurable': {'thread_id': thread_key}})
         booking_history = state.values.get('booking_history', [])
+        index = current_index(state.values)
         
         return {
             "thread_id": thread_id,
             "total_bookings": len(booking_history),
+            "total_guests": index["total_guests"],
+            "bookings_by_date": index["by_date"],
             "bookings": booking_history
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/export/conversations", dependencies=[Depends(require_admin)])
+async def export_conversations(request: Request, format: str = "ndjson"):
+    """
+    Export the request tenant's threads (messages, booking_history, timestamps)
+    in one pass, with the thread ids the tenant's clients use. Needs the
+    admin credential as well as the tenant's key.
+    NDJSON is streamed; Parquet is written to a temp file first because
+    its footer can only be written at the end.
+    """
+    tenant = resolve_tenant(request.headers)
+    if format == "ndjson":
+        return StreamingResponse(
+            iter_ndjson(iter_conversations(DB_PATH, thread_prefix=tenant.thread_prefix)),
+            media_type="application/x-ndjson",
+            headers={"Content-Disposition": "attachment; filename=conversations.ndjson"}
+        )
+    
+    if format == "parquet":
+        fd, path = tempfile.mkstemp(suffix=".parquet")
+        os.close(fd)
+        await run_in_threadpool(write_parquet, iter_conversations(DB_PATH, thread_prefix=tenant.thread_prefix), path)
+        return FileResponse(
+            path,
+            media_type="application/vnd.apache.parquet",
+            filename="conversations.parquet",
+            background=BackgroundTask(os.remove, path)
+        )
+    
+    raise HTTPException(status_code=400, detail="format must be 'ndjson' or 'parquet'")
+
+@app.post("/import/conversations", dependencies=[Depends(require_admin)])
+async def import_conversations_endpoint(request: Request):
+    """
+    Bulk import threads from an NDJSON body produced by /export/conversations
+    into the request tenant's threads. Needs the admin credential as well as
+    the tenant's key.
+    The body is parsed as it arrives and written in small batches.
+    """
+    tenant = resolve_tenant(request.headers)
+    totals = {"threads": 0, "messages": 0}
+    # Pieces of the line still being received; joined once, when its newline arrives
+    pending = []
+    pending_bytes = 0
+    lines = []
+    
+    def scoped(records):
+        for record in records:
+            yield {**record, "thread_id": tenant.thread_id(record["thread_id"]), "tenant_id": tenant.id}
+    
+    async def flush():
+        result = await run_in_threadpool(import_conversations, chatbot, list(scoped(read_ndjson(lines))))
+        totals["threads"] += result["threads"]
+        totals["messages"] += result["messages"]
+        lines.clear()
+    
+    try:
+        async for chunk in request.stream():
+            *complete, rest = chunk.split(b"\n")
+            if complete:
+                complete[0] = b"".join([*pending, complete[0]])
+                pending, pending_bytes = [], 0
+            pending.append(rest)
+            pending_bytes += len(rest)
+            if pending_bytes > MAX_IMPORT_LINE_BYTES or any(len(line) > MAX_IMPORT_LINE_BYTES for line in complete):
+                raise HTTPException(
+                    status_code=413,
+                    detail=f"Import record exceeds {MAX_IMPORT_LINE_BYTES} bytes after {totals['threads']} threads"
+                )
+            lines.extend(complete)
+            if len(lines) >= IMPORT_BATCH_SIZE:
+                await flush()
+        lines.append(b"".join(pending))
+        await flush()
+    except (ValueError, KeyError, TypeError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid import record after {totals['threads']} threads: {e}")
+    
+    return totals
+
+# **************************************** Admin Endpoints *************************
+
+admin = APIRouter(prefix="/admin", dependencies=[Depends(require_admin)])
+
+@admin.post("/routing/explain")
+async def explain_routing(request: RouteExplainRequest, http_request: Request):
+    """
+    Show which routing rule fires for a message. If thread_id is given,
+    the thread's current booking flow state is used. Uses the request's tenant.
+    """
+    tenant = resolve_tenant(http_request.headers)
+    in_booking_flow = request.in_booking_flow
+    if request.thread_id:
+        state = chatbot.get_state(config={'configurable': {'thread_id': scoped_thread_id(tenant, request.thread_id)}})
+        in_booking_flow = bool(state.values.get('in_booking_flow'))
+    
+    input_valid, _ = validate_input(request.message, tenant)
+    decision = explain_route({
+        "messages": [HumanMessage(content=request.message)],
+        "input_valid": input_valid,
+        "in_booking_flow": in_booking_flow,
+        "tenant_id": tenant.id
+    })
+    
+    return {
+        "tenant_id": tenant.id,
+        "message": request.message,
+        "in_booking_flow": in_booking_flow,
+        **decision
+    }
+
+@admin.get("/routing/rules")
+async def get_routing_rules():
+    """
+    Describe the active routing rules file
+    """
+    return rule_store.info()
+
+@admin.post("/routing/reload")
+async def reload_routing_rules():
+    """
+    Force a reload of the routing rules file
+    """
+    if not rule_store.reload():
+        raise HTTPException(status_code=400, detail=rule_store.last_error)
+    return rule_store.info()
+
+@admin.get("/speculation")
+async def get_speculation_stats():
+    """
+    Speculative LLM execution counters: how often the LLM call was
+    used, avoided (cancelled before sending) or wasted (cancelled in flight)
+    """
+    return speculator.stats()
+
+@admin.get("/prompt")
+async def get_prompt_stats():
+    """
+    Active system prompt and its version, plus prompt token accounting:
+    cached vs uncached prompt tokens in total and for recent turns
+    """
+    return prompt_manager.stats()
+
+@admin.post("/prompt/reload")
+async def reload_prompt():
+    """
+    Re-read the system prompt file (SYSTEM_PROMPT_PATH)
+    """
+    try:
+        version = prompt_manager.reload()
+    except OSError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    return {"prompt_version": version}
+
+@admin.get("/memory")
+async def get_memory_stats():
+    """
+    Body size limits and per-request memory accounting
+    (peaks need MEMORY_ACCOUNTING=1)
+    """
+    return memory_ledger.stats()
+
+@admin.get("/tenants")
+async def get_tenant_stats():
+    """
+    Loaded tenants, their approximate size, and cache hits/misses/evictions
+    """
+    return tenant_registry.stats()
+
+@admin.post("/tenants/reload")
+async def reload_tenants(tenant_id: Optional[str] = None):
+    """
+    Re-read the API key index and drop cached tenants (one, or all),
+    so edited tenant files are picked up on next use
+    """
+    keys = tenant_registry.reload_keys()
+    tenant_registry.evict(tenant_id)
+    return {"api_keys": keys, "evicted": tenant_id or "all"}
+
+@admin.get("/jobs")
+async def get_job_stats():
+    """
+    Background job queue: depth, lag, running and dead-lettered jobs, attempt counters
+    """
+    return await run_in_threadpool(job_queue.stats)
+
+@admin.get("/jobs/dead")
+async def get_dead_jobs(limit: int = 50):
+    """
+    Most recent dead-lettered jobs with their last error
+    """
+    return {"jobs": await run_in_threadpool(job_queue.dead_letters, limit)}
+
+@admin.post("/jobs/{job_id}/retry")
+async def retry_job(job_id: int):
+    """
+    Re-queue a dead-lettered job with a fresh set of attempts
+    """
+    if not await run_in_threadpool(job_queue.retry, job_id):
+        raise HTTPException(status_code=404, detail=f"No dead-lettered job {job_id}")
+    return {"job_id": job_id, "status": "queued"}
+
+@admin.get("/static")
+async def get_static_stats():
+    """
+    UI assets with their cache policy and compressed sizes, plus JSON compression counters
+    """
+    return {**asset_store.info(), "compression": compression_stats()}
+
+@admin.get("/corpus")
+async def get_corpus_stats():
+    """
+    Conversation corpus recording status (CORPUS_RECORD_PATH)
+    """
+    return corpus_recorder.stats()
+
+@admin.get("/guardrails")
+async def get_guardrail_stats():
+    """
+    Output guardrail counters: responses checked and words masked
+    """
+    return output_guard.stats()
+
+@admin.get("/llm")
+async def get_llm_stats():
+    """
+    LLM router state: per-endpoint circuit breaker, latency and error counts,
+    plus hedging and failover counters
+    """
+    return llm.stats()
+
+@admin.get("/traces")
+async def list_traces():
+    """
+    Recently recorded (sampled) traces, newest first
+    """
+    return tracer.list_recent()
+
+@admin.get("/traces/{trace_id}")
+async def get_trace(trace_id: str, view: str = "json"):
+    """
+    A recorded trace as JSON spans, or as a text waterfall with ?view=text
+    """
+    trace_data = tracer.get(trace_id)
+    if trace_data is None:
+        raise HTTPException(status_code=404, detail="Trace not found (not sampled or expired)")
+    if view == "text":
+        return PlainTextResponse(render_waterfall(trace_data))
+    return trace_data
+
+app.include_router(admin)
+
 # **************************************** Run Instructions *************************
 # To run this API:
 # 1. Save this file as main.py
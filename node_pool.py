@@ -0,0 +1,77 @@
+import functools
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+# -------------------
+# Config
+# -------------------
+# NODE_POOL_WORKERS=0 (default) keeps every node in the server process.
+NODE_POOL_WORKERS = int(os.getenv("NODE_POOL_WORKERS", "0"))
+# Workers are started from a clean process, never forked from the server: by the time the
+# pool starts, the server already runs threads (llm-loop, job workers, the event loop's
+# executor) whose locks a forked child would inherit mid-use.
+NODE_POOL_START_METHOD = os.getenv(
+    "NODE_POOL_START_METHOD",
+    "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+)
+
+_executor = None
+
+# -------------------
+# Worker side
+# -------------------
+def _init_worker():
+    """Preload read-only data so the first offloaded call doesn't pay for it."""
+    import langgraph_tool_backend as backend
+
+    backend.get_rules()
+    backend.validate_input("warm up")
+
+def _ping() -> int:
+    return os.getpid()
+
+# -------------------
+# Server side
+# -------------------
+def start_pool(workers: int = NODE_POOL_WORKERS, start_method: str = NODE_POOL_START_METHOD) -> bool:
+    """Start the process pool. Returns False if pooling is disabled."""
+    global _executor
+    if workers <= 0:
+        return False
+    if _executor is not None:
+        return True
+
+    _executor = ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context(start_method),
+        initializer=_init_worker
+    )
+    # Spawn every worker now, before the server starts handling traffic.
+    for future in [_executor.submit(_ping) for _ in range(workers)]:
+        future.result()
+    return True
+
+def shutdown_pool():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=True, cancel_futures=True)
+        _executor = None
+
+def pool_enabled() -> bool:
+    return _executor is not None
+
+def offload_node(node):
+    """
+    Wrap a rule-based graph node so it runs in the pool.
+    Only the last message is shipped to the worker - these nodes never look further back,
+    and pickling the full history on every turn would cost more than the node itself.
+    """
+    @functools.wraps(node)
+    def wrapper(state):
+        if _executor is None:
+            return node(state)
+        slim_state = {**state, "messages": state["messages"][-1:]}
+        return _executor.submit(node, slim_state).result()
+
+    return wrapper
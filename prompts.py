@@ -0,0 +1,184 @@
+import hashlib
+import os
+import threading
+from collections import deque
+
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+
+# -------------------
+# Config
+# -------------------
+# Optional file holding the system prompt; reloaded via /admin/prompt/reload
+SYSTEM_PROMPT_PATH = os.getenv("SYSTEM_PROMPT_PATH")
+# Once a thread has more unsummarized messages than this, the oldest block is
+# folded into the thread summary. Folding a whole block at a time keeps the
+# prompt prefix unchanged for many turns in between.
+PROMPT_SUMMARY_AFTER = int(os.getenv("PROMPT_SUMMARY_AFTER", "40"))
+PROMPT_SUMMARY_BLOCK = int(os.getenv("PROMPT_SUMMARY_BLOCK", "20"))
+# Each folded block becomes one summary entry of at most PROMPT_SUMMARY_BLOCK_CHARS;
+# the summary only grows by whole entries, up to PROMPT_SUMMARY_MAX_CHARS
+PROMPT_SUMMARY_BLOCK_CHARS = int(os.getenv("PROMPT_SUMMARY_BLOCK_CHARS", "600"))
+PROMPT_SUMMARY_MAX_CHARS = int(os.getenv("PROMPT_SUMMARY_MAX_CHARS", "4000"))
+SUMMARY_LINE_MIN_CHARS = 40
+RECENT_TURNS = 100
+
+DEFAULT_SYSTEM_PROMPT = (
+    "You are a friendly, concise assistant. Answer general questions directly and use the "
+    "search tool only for current events or facts you are unsure about. Table bookings are "
+    "handled separately, so do not invent booking details or confirmations. Keep the "
+    "conversation respectful."
+)
+
+# -------------------
+# Summaries
+# -------------------
+def summary_lines(messages: list) -> list[tuple[str, str]]:
+    """(role, text) per user/assistant message, whitespace collapsed; tool traffic is dropped."""
+    lines = []
+    for message in messages:
+        if not isinstance(message.content, str) or not message.content.strip():
+            continue
+        if isinstance(message, HumanMessage):
+            role = "User"
+        elif isinstance(message, AIMessage):
+            role = "Assistant"
+        else:
+            continue
+        lines.append((role, " ".join(message.content.split())))
+    return lines
+
+def summarize_block(messages: list, max_chars: int = PROMPT_SUMMARY_BLOCK_CHARS) -> str:
+    """
+    One summary entry for a folded block: a line per message, each cut to an
+    equal share of max_chars. Depends only on the block itself, so the same
+    block always yields the same bytes.
+    """
+    lines = summary_lines(messages)
+    if not lines:
+        return ""
+    share = max(SUMMARY_LINE_MIN_CHARS, max_chars // len(lines))
+    entry = []
+    for role, text in lines:
+        limit = max(1, share - len(role) - 3)
+        entry.append(f"{role}: {text[:limit]}…" if len(text) > limit else f"{role}: {text}")
+    return "\n".join(entry)[:max_chars]
+
+def fold_point(messages: list, start: int, block: int) -> int:
+    """
+    Index to summarize up to: at least `block` messages past `start`, moved
+    forward to the next user message so a tool call is never split from its result.
+    """
+    index = start + block
+    while index < len(messages) and not isinstance(messages[index], HumanMessage):
+        index += 1
+    return index
+
+# -------------------
+# Prompt manager
+# -------------------
+class PromptManager:
+    """
+    Owns the system prompt and lays out every LLM request as
+        system prompt → thread summary → messages since the summary
+    Tool definitions are bound once (in a fixed order) and sit ahead of all
+    of it on the provider side, so consecutive turns of a thread share the
+    longest possible prefix and hit the provider's prompt cache.
+    """
+
+    def __init__(self, path: str | None = SYSTEM_PROMPT_PATH, summary_after: int = PROMPT_SUMMARY_AFTER,
+                 summary_block: int = PROMPT_SUMMARY_BLOCK):
+        self.path = path
+        self.summary_after = summary_after
+        self.summary_block = summary_block
+        self.lock = threading.Lock()
+        self.system_prompt = self._load()
+        self.counters = {"turns": 0, "prompt_tokens": 0, "cached_tokens": 0, "summaries": 0}
+        self.recent = deque(maxlen=RECENT_TURNS)
+
+    def _load(self) -> str:
+        if not self.path:
+            return DEFAULT_SYSTEM_PROMPT
+        with open(self.path, encoding="utf-8") as f:
+            return f.read().strip()
+
+    def reload(self) -> str:
+        """Re-read the prompt file; a changed prompt invalidates every cached prefix once."""
+        prompt = self._load()
+        with self.lock:
+            self.system_prompt = prompt
+        return self.version
+
+    @property
+    def version(self) -> str:
+        return hashlib.sha256(self.system_prompt.encode("utf-8")).hexdigest()[:12]
+
+    def compact(self, messages: list, summary: str, summarized: int) -> tuple[str, int]:
+        """
+        Fold the oldest blocks of messages into the summary once the tail grows too long.
+
+        The summary is append-only: each folded block adds one entry (summarize_block),
+        and text already in the summary is never rewritten or trimmed, so the prompt
+        prefix of earlier turns stays byte-identical. A block whose entry would take
+        the summary past PROMPT_SUMMARY_MAX_CHARS is still folded out of the prompt,
+        but left out of the summary; from then on the summary only grows by entries
+        that still fit.
+        """
+        start = summarized
+        while len(messages) - summarized > self.summary_after:
+            end = fold_point(messages, summarized, self.summary_block)
+            if end >= len(messages):
+                break
+            entry = summarize_block(messages[summarized:end])
+            if entry and len(summary) + len(entry) + 1 <= PROMPT_SUMMARY_MAX_CHARS:
+                summary = f"{summary}\n{entry}" if summary else entry
+            summarized = end
+        if summarized == start:
+            return summary, summarized
+        with self.lock:
+            self.counters["summaries"] += 1
+        return summary, summarized
+
+    def assemble(self, messages: list, summary: str = "", summarized: int = 0) -> list:
+        """Stable prefix first, volatile tail last."""
+        prompt = [SystemMessage(content=self.system_prompt)]
+        if summary:
+            prompt.append(SystemMessage(content=f"Summary of the earlier conversation:\n{summary}"))
+        return prompt + list(messages[summarized:])
+
+    def record_usage(self, thread_id: str | None, response) -> dict | None:
+        """Book the cached/uncached prompt tokens reported for one LLM response."""
+        usage = getattr(response, "usage_metadata", None)
+        if not usage:
+            return None
+        prompt_tokens = usage.get("input_tokens", 0)
+        cached = (usage.get("input_token_details") or {}).get("cache_read", 0) or 0
+        turn = {
+            "thread_id": thread_id,
+            "prompt_version": self.version,
+            "prompt_tokens": prompt_tokens,
+            "cached_tokens": cached,
+            "uncached_tokens": prompt_tokens - cached,
+            "output_tokens": usage.get("output_tokens", 0),
+        }
+        with self.lock:
+            self.counters["turns"] += 1
+            self.counters["prompt_tokens"] += prompt_tokens
+            self.counters["cached_tokens"] += cached
+            self.recent.append(turn)
+        return turn
+
+    def stats(self) -> dict:
+        with self.lock:
+            counters = dict(self.counters)
+            recent = list(self.recent)
+        prompt_tokens = counters["prompt_tokens"]
+        return {
+            "prompt_version": self.version,
+            "system_prompt": self.system_prompt,
+            **counters,
+            "uncached_tokens": prompt_tokens - counters["cached_tokens"],
+            "cache_hit_rate": round(counters["cached_tokens"] / prompt_tokens, 3) if prompt_tokens else 0.0,
+            "recent_turns": recent,
+        }
+
+prompt_manager = PromptManager()
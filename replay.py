@@ -0,0 +1,193 @@
+"""
+Replay a recorded conversation corpus (see corpus.py) through the graph.
+
+Each recorded thread is replayed turn by turn against a freshly compiled graph
+with an in-memory checkpointer, under the tenant it was recorded for (corpora
+recorded before tenants were recorded replay as the default tenant); threads
+run in parallel. The LLM is stubbed:
+wherever chat_node called the model, the stub returns what chat_node answered
+in the recording, so answer diffs point at rule/filter/routing changes rather
+than model randomness. Tool calls are not replayed.
+
+The run is compared with a baseline - the recording itself by default, or an
+earlier replay saved with --out (use that for speed comparisons: recorded
+timings include real LLM latency). Reports route and answer diffs and per-node
+timing deltas; exits with status 1 if any route or answer changed.
+
+Usage:
+    python replay.py corpus/traffic.ndjson.gz --out runs/before.ndjson.gz
+    # ... change routing rules / filters ...
+    python replay.py corpus/traffic.ndjson.gz --baseline runs/before.ndjson.gz
+"""
+
+import argparse
+import contextvars
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+os.environ.setdefault("LLM_PROVIDER", "fake")
+# Jobs enqueued by replayed turns must not reach the server's queue
+os.environ.setdefault("JOBS_DB_PATH", ":memory:")
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, HumanMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langgraph.checkpoint.memory import InMemorySaver
+
+import langgraph_tool_backend as backend
+from corpus import FORMAT_VERSION, TurnRecorder, open_corpus, read_corpus, summarize_turn
+from tenants import DEFAULT_TENANT
+
+recorded_answer = contextvars.ContextVar("recorded_answer", default="")
+
+# -------------------
+# Stubbed LLM
+# -------------------
+class ReplayChatModel(BaseChatModel):
+    """Answers with the recorded chat_node output of the turn being replayed."""
+
+    @property
+    def _llm_type(self) -> str:
+        return "replay"
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=recorded_answer.get()))])
+
+def llm_answer(record: dict) -> str:
+    """What the LLM contributed in the recording: chat_node's last output."""
+    outputs = [node["out"][-1] for node in record["nodes"] if node["n"] == "chat_node" and node["out"]]
+    return outputs[-1] if outputs else ""
+
+# -------------------
+# Replay
+# -------------------
+class ReplayCollector:
+    """Stands in for CorpusRecorder: keeps TurnRecorder's records in memory."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.records = []
+        self.turn = 0
+
+    def record(self, thread_id: str, message: str, nodes: list, elapsed_ms: float, error: str | None = None,
+               tenant_id: str | None = None):
+        route, answer = summarize_turn(nodes)
+        record = {"v": FORMAT_VERSION, "t": thread_id, "i": self.turn, "ts": round(time.time(), 3),
+                  "tenant": tenant_id or DEFAULT_TENANT, "in": message, "route": route, "nodes": nodes, "ans": answer, "ms": round(elapsed_ms, 3)}
+        if error:
+            record["error"] = error
+        with self.lock:
+            self.records.append(record)
+
+def replay_thread(chatbot, turns: list) -> list:
+    collector = ReplayCollector()
+    for turn in turns:
+        collector.turn = turn["i"]
+        config = {'configurable': {'thread_id': turn["t"]}, "callbacks": [TurnRecorder(collector, turn["t"])]}
+        token = recorded_answer.set(llm_answer(turn))
+        try:
+            chatbot.invoke({"messages": [HumanMessage(content=turn["in"])], "tenant_id": turn.get("tenant", DEFAULT_TENANT)},
+                           config=config)
+        except Exception:
+            pass  # recorded with its error by the TurnRecorder
+        finally:
+            recorded_answer.reset(token)
+    return collector.records
+
+def load_threads(path: str) -> dict:
+    threads = defaultdict(list)
+    for record in read_corpus(path):
+        threads[record["t"]].append(record)
+    for turns in threads.values():
+        turns.sort(key=lambda r: r["i"])
+    return threads
+
+def replay(path: str, workers: int) -> tuple[list, float]:
+    backend.llm_with_tools = ReplayChatModel()
+    chatbot = backend.build_graph(InMemorySaver())
+    threads = load_threads(path)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        results = list(executor.map(lambda turns: replay_thread(chatbot, turns), threads.values()))
+    elapsed = time.perf_counter() - start
+    return [record for records in results for record in records], elapsed
+
+# -------------------
+# Report
+# -------------------
+def percentile(values: list, share: float) -> float:
+    values = sorted(values)
+    return values[max(0, int(len(values) * share) - 1)] if values else 0.0
+
+def node_times(records: list) -> dict:
+    times = defaultdict(list)
+    for record in records:
+        for node in record["nodes"]:
+            times[node["n"]].append(node["ms"])
+    return times
+
+def report(baseline: list, replayed: list, show: int) -> int:
+    base = {(r["t"], r["i"]): r for r in baseline}
+    pairs = [(base[(r["t"], r["i"])], r) for r in replayed if (r["t"], r["i"]) in base]
+    route_diffs = [(b, r) for b, r in pairs if b["route"] != r["route"]]
+    answer_diffs = [(b, r) for b, r in pairs if b["ans"] != r["ans"]]
+
+    print(f"turns compared:   {len(pairs)} of {len(replayed)} replayed")
+    print(f"route diffs:      {len(route_diffs)}")
+    for b, r in route_diffs[:show]:
+        print(f"  [{b['t']}#{b['i']}] {b['route']} -> {r['route']}: {b['in'][:80]!r}")
+    print(f"answer diffs:     {len(answer_diffs)}")
+    for b, r in answer_diffs[:show]:
+        print(f"  [{b['t']}#{b['i']}] {b['in'][:60]!r}")
+        print(f"      - {b['ans'][:100]!r}")
+        print(f"      + {r['ans'][:100]!r}")
+
+    base_turns = [b["ms"] for b, _ in pairs]
+    new_turns = [r["ms"] for _, r in pairs]
+    if pairs:
+        print(f"turn ms p50:      {statistics.median(base_turns):.3f} -> {statistics.median(new_turns):.3f}")
+        print(f"turn ms p95:      {percentile(base_turns, 0.95):.3f} -> {percentile(new_turns, 0.95):.3f}")
+
+    base_nodes = node_times([b for b, _ in pairs])
+    new_nodes = node_times([r for _, r in pairs])
+    print(f"{'node':<24} {'calls':>7} {'base ms':>10} {'replay ms':>10} {'delta':>8}")
+    for name in sorted(set(base_nodes) | set(new_nodes)):
+        before = statistics.mean(base_nodes[name]) if base_nodes[name] else 0.0
+        after = statistics.mean(new_nodes[name]) if new_nodes[name] else 0.0
+        delta = f"{(after - before) / before * 100:+.1f}%" if before else "new"
+        print(f"{name:<24} {len(new_nodes[name]):>7} {before:>10.3f} {after:>10.3f} {delta:>8}")
+
+    return 1 if route_diffs or answer_diffs else 0
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("corpus")
+    parser.add_argument("--baseline", help="earlier replay (--out) to compare with; default: the recording")
+    parser.add_argument("--out", help="write this run's turns here, in corpus format")
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--show", type=int, default=10, help="diff examples to print")
+    args = parser.parse_args()
+
+    replayed, elapsed = replay(args.corpus, args.workers)
+    print(f"replayed:         {len(replayed)} turns in {elapsed:.2f}s ({len(replayed) / elapsed:.1f} turns/s)")
+
+    if args.out:
+        directory = os.path.dirname(args.out)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open_corpus(args.out, "wt") as f:
+            for record in replayed:
+                f.write(json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n")
+
+    baseline = list(read_corpus(args.baseline or args.corpus))
+    sys.exit(report(baseline, replayed, args.show))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,212 @@
+import json
+import os
+import re
+import threading
+import time
+
+# -------------------
+# Config
+# -------------------
+DEFAULT_RULES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "routing_rules.json")
+RULES_PATH = os.getenv("ROUTING_RULES_PATH", DEFAULT_RULES_PATH)
+RELOAD_INTERVAL = float(os.getenv("ROUTING_RULES_RELOAD_INTERVAL", "2"))
+
+VALID_ROUTES = {"chat_node", "booking_handler", "booking_query_handler"}
+VALID_MATCHERS = {"booking_query", "booking_intent", "confirmation", "question"}
+
+class RoutingRulesError(ValueError):
+    """Raised when a routing rules file cannot be compiled."""
+
+# -------------------
+# Compilation
+# -------------------
+def compile_terms(terms: list, prefix: str = "", suffix: str = "") -> re.Pattern | None:
+    """Compile a keyword list into one alternation regex (longest terms first)."""
+    terms = [t.lower() for t in terms if t]
+    if not terms:
+        return None
+    ordered = sorted(set(terms), key=len, reverse=True)
+    alternation = "|".join(re.escape(t) for t in ordered)
+    return re.compile(f"{prefix}(?:{alternation}){suffix}")
+
+def first_match(pattern: re.Pattern | None, text: str) -> str | None:
+    """Return the first matched term, or None."""
+    if pattern is None:
+        return None
+    match = pattern.search(text)
+    return match.group(0) if match else None
+
+class RuleSet:
+    """Routing and intent vocabulary compiled into regex matchers and an ordered decision table."""
+
+    def __init__(self, data: dict, source: str = "<memory>"):
+        self.source = source
+        self.loaded_at = time.time()
+
+        booking_query = data.get("booking_query", {})
+        booking_intent = data.get("booking_intent", {})
+        confirmation = data.get("confirmation", {})
+        question = data.get("question", {})
+
+        self.booking_query_re = compile_terms(booking_query.get("patterns", []))
+        # Generic asks ("how many", "total") only count together with a booking subject
+        self.booking_subject_re = compile_terms(booking_query.get("subjects", []))
+        self.booking_ask_re = compile_terms(booking_query.get("asks", []))
+        self.booking_verb_re = compile_terms(booking_intent.get("verbs", []))
+        self.booking_noun_re = compile_terms(booking_intent.get("nouns", []))
+        self.booking_explicit_re = compile_terms(booking_intent.get("explicit_phrases", []))
+        self.confirmation_question_re = compile_terms(confirmation.get("question_words", []))
+        self.positive_start_re = compile_terms(confirmation.get("positive", []), prefix="^")
+        self.positive_comma_re = compile_terms(confirmation.get("positive", []), suffix=",")
+        self.negative_re = compile_terms(confirmation.get("negative", []))
+        self.question_re = compile_terms(question.get("indicators", []))
+
+        self.routes = []
+        for row in data.get("routes", []):
+            route = row.get("route")
+            matcher = row.get("match")
+            if route not in VALID_ROUTES:
+                raise RoutingRulesError(f"Unknown route {route!r} in rule {row.get('name')!r}")
+            if matcher is not None and matcher not in VALID_MATCHERS:
+                raise RoutingRulesError(f"Unknown matcher {matcher!r} in rule {row.get('name')!r}")
+            self.routes.append({
+                "name": row.get("name", route),
+                "in_booking_flow": row.get("in_booking_flow"),
+                "match": matcher,
+                "route": route,
+            })
+        if not self.routes or self.routes[-1]["match"] is not None or self.routes[-1]["in_booking_flow"] is not None:
+            raise RoutingRulesError("The last routing rule must be an unconditional default")
+
+    # Matchers return the matched term (or None) so callers can explain decisions.
+    def match_booking_query(self, message: str) -> str | None:
+        message_lower = message.lower()
+        explicit = first_match(self.booking_query_re, message_lower)
+        if explicit:
+            return explicit
+        subject = first_match(self.booking_subject_re, message_lower)
+        ask = first_match(self.booking_ask_re, message_lower)
+        if subject and ask:
+            return f"{ask} + {subject}"
+        return None
+
+    def match_booking_intent(self, message: str) -> str | None:
+        message_lower = message.lower()
+        explicit = first_match(self.booking_explicit_re, message_lower)
+        if explicit:
+            return explicit
+        verb = first_match(self.booking_verb_re, message_lower)
+        noun = first_match(self.booking_noun_re, message_lower)
+        if verb and noun:
+            return f"{verb} + {noun}"
+        return None
+
+    def match_confirmation(self, message: str) -> tuple[bool, bool, str | None]:
+        """Return (is_confirmation, is_positive, matched_term)."""
+        message_lower = message.lower().strip()
+
+        # Not a confirmation if it's a question
+        if "?" in message or first_match(self.confirmation_question_re, message_lower):
+            return False, False, None
+
+        positive = first_match(self.positive_start_re, message_lower) or first_match(self.positive_comma_re, message_lower)
+        if positive:
+            return True, True, positive.rstrip(",")
+
+        negative = first_match(self.negative_re, message_lower)
+        if negative:
+            return True, False, negative
+
+        return False, False, None
+
+    def match_question(self, message: str) -> str | None:
+        return first_match(self.question_re, message.lower())
+
+    def match(self, matcher: str, message: str) -> str | None:
+        if matcher == "confirmation":
+            return self.match_confirmation(message)[2]
+        return getattr(self, f"match_{matcher}")(message)
+
+    def decide(self, message: str, in_booking_flow: bool = False) -> dict:
+        """Walk the decision table; the first row whose conditions hold wins."""
+        for row in self.routes:
+            if row["in_booking_flow"] is not None and bool(in_booking_flow) != row["in_booking_flow"]:
+                continue
+            term = None
+            if row["match"] is not None:
+                term = self.match(row["match"], message)
+                if not term:
+                    continue
+            return {"route": row["route"], "rule": row["name"], "matched": term}
+        # Unreachable: the constructor guarantees an unconditional default row.
+        return {"route": "chat_node", "rule": "default", "matched": None}
+
+def load_rules(path: str) -> RuleSet:
+    """Read and compile a rules file."""
+    try:
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+        raise RoutingRulesError(f"Could not load routing rules from {path}: {e}") from e
+    return RuleSet(data, source=path)
+
+# -------------------
+# Hot reload
+# -------------------
+class RuleStore:
+    """Holds the active RuleSet and swaps it when the rules file changes on disk."""
+
+    def __init__(self, path: str, reload_interval: float = RELOAD_INTERVAL):
+        self.path = path
+        self.reload_interval = reload_interval
+        self.lock = threading.Lock()
+        self.last_error = None
+        self.rules = load_rules(path)
+        self.mtime = self._stat()
+        self.checked_at = time.monotonic()
+
+    def _stat(self) -> float | None:
+        try:
+            return os.stat(self.path).st_mtime
+        except OSError:
+            return None
+
+    def get(self) -> RuleSet:
+        """Return the active rules, checking the file mtime at most once per interval."""
+        now = time.monotonic()
+        if now - self.checked_at >= self.reload_interval:
+            self.checked_at = now
+            mtime = self._stat()
+            if mtime is not None and mtime != self.mtime:
+                self.reload()
+        return self.rules
+
+    def reload(self) -> bool:
+        """Recompile the rules file. On error the previous rules stay active."""
+        with self.lock:
+            mtime = self._stat()
+            try:
+                rules = load_rules(self.path)
+            except RoutingRulesError as e:
+                self.last_error = str(e)
+                self.mtime = mtime
+                print(f"⚠️ Routing rules reload failed, keeping previous rules: {e}")
+                return False
+            self.rules = rules
+            self.mtime = mtime
+            self.last_error = None
+            print(f"✓ Routing rules reloaded from {self.path}")
+            return True
+
+    def info(self) -> dict:
+        return {
+            "path": self.path,
+            "loaded_at": self.rules.loaded_at,
+            "rules": [row["name"] for row in self.rules.routes],
+            "last_error": self.last_error,
+        }
+
+rule_store = RuleStore(RULES_PATH)
+
+def get_rules() -> RuleSet:
+    return rule_store.get()
@@ -0,0 +1,128 @@
+import asyncio
+import os
+import threading
+import time
+
+from cancellation import cancellable, submit
+
+# -------------------
+# Config
+# -------------------
+# off: checks first, LLM only on a miss (default)
+# always: start the LLM call alongside the checks on every turn
+# adaptive: speculate only while it pays off (see Speculator.should_speculate)
+SPECULATIVE_MODE = os.getenv("SPECULATIVE_MODE", "off")
+# Hold the LLM request back this long; if the checks answer first, nothing is sent
+SPECULATIVE_DELAY_MS = float(os.getenv("SPECULATIVE_DELAY_MS", "0"))
+# adaptive: don't speculate if more than this share of turns is answered deterministically
+SPECULATIVE_MAX_HIT_RATE = float(os.getenv("SPECULATIVE_MAX_HIT_RATE", "0.3"))
+# adaptive: don't speculate if the checks are cheaper than this on average
+SPECULATIVE_MIN_CHECK_MS = float(os.getenv("SPECULATIVE_MIN_CHECK_MS", "5"))
+
+EWMA_ALPHA = 0.1
+
+# -------------------
+# Speculator
+# -------------------
+class Speculator:
+    """Runs the LLM call concurrently with deterministic checks and cancels it on a hit."""
+
+    def __init__(self, mode: str = SPECULATIVE_MODE, delay_ms: float = SPECULATIVE_DELAY_MS,
+                 max_hit_rate: float = SPECULATIVE_MAX_HIT_RATE, min_check_ms: float = SPECULATIVE_MIN_CHECK_MS):
+        if mode not in ("off", "always", "adaptive"):
+            raise ValueError(f"Unknown speculative mode: {mode!r}")
+        self.mode = mode
+        self.delay_ms = delay_ms
+        self.max_hit_rate = max_hit_rate
+        self.min_check_ms = min_check_ms
+        self.lock = threading.Lock()
+        self.hit_rate = 0.0
+        self.check_ms = 0.0
+        self.counters = {
+            "turns": 0,
+            "speculated": 0,
+            "used": 0,            # LLM result was needed
+            "avoided": 0,         # cancelled before the request was sent
+            "wasted": 0,          # cancelled after the request was sent
+            "saved_ms_total": 0.0,
+        }
+
+    def should_speculate(self) -> bool:
+        if self.mode == "always":
+            return True
+        if self.mode == "adaptive":
+            return self.hit_rate <= self.max_hit_rate and self.check_ms >= self.min_check_ms
+        return False
+
+    def _observe(self, hit: bool, check_ms: float):
+        with self.lock:
+            self.counters["turns"] += 1
+            self.hit_rate += EWMA_ALPHA * ((1.0 if hit else 0.0) - self.hit_rate)
+            self.check_ms += EWMA_ALPHA * (check_ms - self.check_ms)
+
+    def _count(self, key: str, saved_ms: float = 0.0):
+        with self.lock:
+            self.counters[key] += 1
+            self.counters["saved_ms_total"] += saved_ms
+
+    def run(self, deterministic, llm_invoke, llm_ainvoke):
+        """
+        deterministic: () -> str | None, run in the calling thread.
+        llm_invoke / llm_ainvoke: sync and async ways to make the same LLM call.
+        Returns (answer, None) on a deterministic hit, else (None, llm_response).
+        """
+        if not self.should_speculate():
+            start = time.perf_counter()
+            answer = deterministic()
+            self._observe(answer is not None, (time.perf_counter() - start) * 1000)
+            if answer is not None:
+                return answer, None
+            if cancellable():
+                # Async, so a cancelled turn aborts the request
+                return None, submit(llm_ainvoke).result()
+            return None, llm_invoke()
+
+        sent = threading.Event()
+
+        async def speculate():
+            if self.delay_ms > 0:
+                await asyncio.sleep(self.delay_ms / 1000)
+            sent.set()
+            return await llm_ainvoke()
+
+        self._count("speculated")
+        future = submit(speculate)
+
+        start = time.perf_counter()
+        try:
+            answer = deterministic()
+        except BaseException:
+            future.cancel()
+            raise
+        check_ms = (time.perf_counter() - start) * 1000
+        self._observe(answer is not None, check_ms)
+
+        if answer is not None:
+            future.cancel()
+            self._count("wasted" if sent.is_set() else "avoided")
+            return answer, None
+
+        # The LLM call was already running while the checks ran
+        self._count("used", saved_ms=max(0.0, check_ms - self.delay_ms))
+        return None, future.result()
+
+    def stats(self) -> dict:
+        with self.lock:
+            counters = dict(self.counters)
+            speculated = counters["speculated"]
+            return {
+                "mode": self.mode,
+                "delay_ms": self.delay_ms,
+                "speculating": self.should_speculate(),
+                "hit_rate_ewma": round(self.hit_rate, 4),
+                "check_ms_ewma": round(self.check_ms, 3),
+                **counters,
+                "waste_ratio": round(counters["wasted"] / speculated, 4) if speculated else 0.0,
+            }
+
+speculator = Speculator()
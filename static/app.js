@@ -0,0 +1,327 @@
+// Configuration
+const API_BASE_URL = 'http://localhost:8000';
+const WS_URL = API_BASE_URL.replace(/^http/, 'ws') + '/ws';
+
+// State management
+let currentThreadId = null;
+let chatThreads = [];
+let isLoading = false;
+let socket = null;
+let activeTurnThreadId = null;
+const turnHandlers = {};
+
+// Initialize app
+function init() {
+    connectSocket();
+    createNewChat();
+}
+
+// Open the persistent WebSocket; /chat/stream is used while it's down
+function connectSocket() {
+    const ws = new WebSocket(WS_URL);
+
+    ws.onopen = () => {
+        socket = ws;
+    };
+
+    ws.onmessage = (event) => {
+        const data = JSON.parse(event.data);
+
+        if (data.type === 'ping') {
+            ws.send(JSON.stringify({ type: 'pong' }));
+            return;
+        }
+
+        const handler = turnHandlers[data.thread_id];
+        if (handler) {
+            handler(data);
+        } else if (data.type === 'error') {
+            showError(data.content);
+        }
+    };
+
+    ws.onclose = () => {
+        socket = null;
+        Object.values(turnHandlers).forEach(handler => {
+            handler({ type: 'error', content: 'Connection lost. Please try again.' });
+        });
+        setTimeout(connectSocket, 3000);
+    };
+}
+
+// Send one turn over the WebSocket; resolves when the turn ends
+function sendViaSocket(message, threadId, onEvent) {
+    return new Promise(resolve => {
+        turnHandlers[threadId] = (data) => {
+            onEvent(data);
+            if (data.type === 'end' || data.type === 'cancelled' || data.type === 'error') {
+                delete turnHandlers[threadId];
+                resolve();
+            }
+        };
+        socket.send(JSON.stringify({ type: 'chat', thread_id: threadId, message: message }));
+    });
+}
+
+// Abort the in-flight turn (WebSocket only)
+function cancelTurn() {
+    if (socket && activeTurnThreadId) {
+        socket.send(JSON.stringify({ type: 'cancel', thread_id: activeTurnThreadId }));
+    }
+}
+
+// Generate UUID
+function generateUUID() {
+    if (window.crypto && crypto.randomUUID) {
+        return crypto.randomUUID();
+    }
+    return 'xxxxxxxx-xxxx-4xxx-yxxx-xxxxxxxxxxxx'.replace(/[xy]/g, function(c) {
+        const r = Math.random() * 16 | 0;
+        const v = c === 'x' ? r : (r & 0x3 | 0x8);
+        return v.toString(16);
+    });
+}
+
+// Create new chat (thread ids are generated here; no server round-trip needed)
+function createNewChat() {
+    currentThreadId = generateUUID();
+    chatThreads.unshift(currentThreadId);
+    clearMessages();
+    updateUI();
+}
+
+// Load conversation
+async function loadConversation(threadId) {
+    try {
+        const response = await fetch(`${API_BASE_URL}/thread/${threadId}/history`);
+        const data = await response.json();
+        
+        currentThreadId = threadId;
+        clearMessages();
+        
+        data.messages.forEach(msg => {
+            addMessageToUI(msg.role, msg.content);
+        });
+        
+        updateUI();
+    } catch (error) {
+        console.error('Error loading conversation:', error);
+        showError('Failed to load conversation');
+    }
+}
+
+// Send message
+async function sendMessage() {
+    const input = document.getElementById('messageInput');
+    const message = input.value.trim();
+    
+    if (isLoading) {
+        cancelTurn();
+        return;
+    }
+    
+    if (!message) return;
+    
+    input.value = '';
+    input.disabled = true;
+    isLoading = true;
+    updateSendButton();
+    
+    // Add user message to UI
+    addMessageToUI('user', message);
+    
+    // Show loading indicator
+    const loadingId = addLoadingIndicator();
+    let assistantMessage = '';
+    let messageElement = null;
+    
+    const handleEvent = (data) => {
+        if (data.type === 'token') {
+            removeLoadingIndicator(loadingId);
+            assistantMessage += data.content;
+            
+            if (!messageElement) {
+                messageElement = addMessageToUI('assistant', assistantMessage);
+            } else {
+                messageElement.textContent = assistantMessage;
+            }
+        } else if (data.type === 'cancelled') {
+            removeLoadingIndicator(loadingId);
+            showError('Response stopped.');
+        } else if (data.type === 'error') {
+            removeLoadingIndicator(loadingId);
+            showError(data.content);
+        }
+    };
+    
+    try {
+        if (socket) {
+            activeTurnThreadId = currentThreadId;
+            updateSendButton();
+            await sendViaSocket(message, currentThreadId, handleEvent);
+            removeLoadingIndicator(loadingId);
+            return;
+        }
+        
+        const response = await fetch(`${API_BASE_URL}/chat/stream`, {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+            },
+            body: JSON.stringify({
+                message: message,
+                thread_id: currentThreadId
+            })
+        });
+
+        removeLoadingIndicator(loadingId);
+        
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+
+        while (true) {
+            const { done, value } = await reader.read();
+            if (done) break;
+
+            const chunk = decoder.decode(value);
+            const lines = chunk.split('\n');
+
+            for (const line of lines) {
+                if (line.startsWith('data: ')) {
+                    try {
+                        handleEvent(JSON.parse(line.slice(6)));
+                    } catch (e) {
+                        console.error('Error parsing SSE data:', e);
+                    }
+                }
+            }
+        }
+    } catch (error) {
+        removeLoadingIndicator(loadingId);
+        console.error('Error sending message:', error);
+        showError('Failed to send message. Please try again.');
+    } finally {
+        input.disabled = false;
+        input.focus();
+        isLoading = false;
+        activeTurnThreadId = null;
+        updateSendButton();
+    }
+}
+
+// Add message to UI
+function addMessageToUI(role, content) {
+    const messagesContainer = document.getElementById('chatMessages');
+    
+    // Remove empty state if present
+    const emptyState = messagesContainer.querySelector('.empty-state');
+    if (emptyState) {
+        emptyState.remove();
+    }
+    
+    const messageDiv = document.createElement('div');
+    messageDiv.className = `message ${role}`;
+    
+    const contentDiv = document.createElement('div');
+    contentDiv.className = 'message-content';
+    contentDiv.textContent = content;
+    
+    messageDiv.appendChild(contentDiv);
+    messagesContainer.appendChild(messageDiv);
+    
+    // Scroll to bottom
+    messagesContainer.scrollTop = messagesContainer.scrollHeight;
+    
+    return contentDiv;
+}
+
+// Add loading indicator
+function addLoadingIndicator() {
+    const messagesContainer = document.getElementById('chatMessages');
+    const loadingDiv = document.createElement('div');
+    const loadingId = 'loading-' + Date.now();
+    loadingDiv.id = loadingId;
+    loadingDiv.className = 'message assistant';
+    loadingDiv.innerHTML = `
+        <div class="message-content loading">
+            <div class="loading-dot"></div>
+            <div class="loading-dot"></div>
+            <div class="loading-dot"></div>
+        </div>
+    `;
+    messagesContainer.appendChild(loadingDiv);
+    messagesContainer.scrollTop = messagesContainer.scrollHeight;
+    return loadingId;
+}
+
+// Remove loading indicator
+function removeLoadingIndicator(loadingId) {
+    const loadingElement = document.getElementById(loadingId);
+    if (loadingElement) {
+        loadingElement.remove();
+    }
+}
+
+// Clear messages
+function clearMessages() {
+    const messagesContainer = document.getElementById('chatMessages');
+    messagesContainer.innerHTML = `
+        <div class="empty-state">
+            <div class="empty-state-icon">💬</div>
+            <h3>Start a Conversation</h3>
+            <p>Send a message to begin chatting with the AI assistant</p>
+        </div>
+    `;
+}
+
+// Update UI
+function updateUI() {
+    // Update thread ID display
+    document.getElementById('currentThreadId').textContent = 
+        `Thread: ${currentThreadId.substring(0, 8)}...`;
+    
+    // Update thread list
+    const threadList = document.getElementById('threadList');
+    threadList.innerHTML = '';
+    
+    chatThreads.forEach(threadId => {
+        const threadDiv = document.createElement('div');
+        threadDiv.className = `thread-item ${threadId === currentThreadId ? 'active' : ''}`;
+        threadDiv.textContent = threadId.substring(0, 8) + '...';
+        threadDiv.onclick = () => loadConversation(threadId);
+        threadList.appendChild(threadDiv);
+    });
+}
+
+// Update send button
+function updateSendButton() {
+    const sendBtn = document.getElementById('sendBtn');
+    // Over the WebSocket a running turn can be stopped
+    const canStop = isLoading && activeTurnThreadId !== null;
+    sendBtn.disabled = isLoading && !canStop;
+    sendBtn.textContent = canStop ? 'Stop' : (isLoading ? 'Sending...' : 'Send');
+}
+
+// Handle key press
+function handleKeyPress(event) {
+    if (event.key === 'Enter' && !event.shiftKey) {
+        event.preventDefault();
+        sendMessage();
+    }
+}
+
+// Show error
+function showError(message) {
+    const messagesContainer = document.getElementById('chatMessages');
+    const errorDiv = document.createElement('div');
+    errorDiv.className = 'error-message';
+    errorDiv.textContent = message;
+    messagesContainer.appendChild(errorDiv);
+    
+    setTimeout(() => {
+        errorDiv.remove();
+    }, 5000);
+}
+
+// Initialize on page load
+window.addEventListener('DOMContentLoaded', init);
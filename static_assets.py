@@ -0,0 +1,306 @@
+"""
+Static UI serving and JSON response compression.
+
+The UI (index.html plus the files in static/) is read and compressed once -
+gzip, and brotli when the `brotli` package is installed - and each request
+gets the smallest variant its Accept-Encoding allows. References from
+index.html to static files are rewritten to content-hashed URLs
+(/static/app.<hash>.js), which are cached for a year as immutable; index.html
+itself is revalidated on every load with its ETag (a 304 costs no body).
+Files are re-read when they change on disk.
+
+CompressionMiddleware compresses JSON responses of the history endpoints
+(COMPRESS_PATHS) between COMPRESS_MIN_BYTES and COMPRESS_MAX_BYTES, and
+answers If-None-Match with a 304 when the body has not changed.
+"""
+
+import asyncio
+import copy
+import gzip
+import hashlib
+import mimetypes
+import os
+import re
+import threading
+import time
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.responses import Response
+
+try:
+    import brotli
+except ImportError:  # optional: gzip only (the server warns once at startup)
+    brotli = None
+
+# -------------------
+# Config
+# -------------------
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+INDEX_PATH = os.getenv("UI_INDEX_PATH", os.path.join(BASE_DIR, "index.html"))
+STATIC_DIR = os.getenv("STATIC_DIR", os.path.join(BASE_DIR, "static"))
+STATIC_RELOAD_INTERVAL = float(os.getenv("STATIC_RELOAD_INTERVAL", "2"))
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE_CONTROL = "no-cache"
+
+# Responses smaller than this gain too little; larger ones are passed through unbuffered
+COMPRESS_MIN_BYTES = int(os.getenv("COMPRESS_MIN_BYTES", "1024"))
+COMPRESS_MAX_BYTES = int(os.getenv("COMPRESS_MAX_BYTES", str(16 * 1024 * 1024)))
+COMPRESS_PATHS = re.compile(os.getenv("COMPRESS_PATHS", r"^/(threads|thread/[^/]+/(history|booking-history))$"))
+# Bodies above this are compressed off the event loop
+COMPRESS_THREAD_BYTES = 256 * 1024
+
+ENCODINGS = ("br", "gzip") if brotli else ("gzip",)
+
+def compress(body: bytes, encoding: str, static: bool = False) -> bytes:
+    """Static assets are compressed once, so they get the slowest, smallest settings."""
+    if encoding == "br":
+        return brotli.compress(body, quality=11 if static else 5)
+    return gzip.compress(body, compresslevel=9 if static else 6, mtime=0)
+
+def pick_encoding(accept_encoding: str, available=ENCODINGS) -> str | None:
+    """First of `available` the client accepts (q > 0), in our order of preference."""
+    accepted = set()
+    for part in accept_encoding.lower().split(","):
+        name, _, params = part.strip().partition(";")
+        match = re.search(r"q=([0-9.]+)", params)
+        try:
+            if match and float(match.group(1)) == 0:
+                continue
+        except ValueError:
+            continue
+        accepted.add(name.strip())
+    for encoding in available:
+        if encoding in accepted or "*" in accepted:
+            return encoding
+    return None
+
+def etag_matches(if_none_match: str | None, digest: str) -> bool:
+    return bool(if_none_match) and (if_none_match.strip() == "*" or digest in if_none_match)
+
+# -------------------
+# Static assets
+# -------------------
+class Asset:
+    """One file with its precompressed variants and per-encoding strong ETags."""
+
+    def __init__(self, body: bytes, media_type: str, cache_control: str):
+        self.media_type = media_type
+        self.cache_control = cache_control
+        self.digest = hashlib.sha256(body).hexdigest()[:32]
+        self.variants = {None: body}
+        for encoding in ENCODINGS:
+            compressed = compress(body, encoding, static=True)
+            if len(compressed) < len(body):
+                self.variants[encoding] = compressed
+
+    @property
+    def version(self) -> str:
+        return self.digest[:12]
+
+    def etag(self, encoding: str | None) -> str:
+        return f'"{self.digest}-{encoding}"' if encoding else f'"{self.digest}"'
+
+    def response(self, headers: Headers) -> Response:
+        encoding = pick_encoding(headers.get("accept-encoding", ""), [e for e in ENCODINGS if e in self.variants])
+        response_headers = {
+            "etag": self.etag(encoding),
+            "cache-control": self.cache_control,
+            "vary": "Accept-Encoding",
+        }
+        if etag_matches(headers.get("if-none-match"), self.digest):
+            return Response(status_code=304, headers=response_headers)
+        if encoding:
+            response_headers["content-encoding"] = encoding
+        return Response(self.variants[encoding], media_type=self.media_type, headers=response_headers)
+
+class AssetStore:
+    """The UI's files by URL path, reloaded when any of them changes on disk."""
+
+    def __init__(self, index_path: str = INDEX_PATH, static_dir: str = STATIC_DIR,
+                 reload_interval: float = STATIC_RELOAD_INTERVAL):
+        self.index_path = index_path
+        self.static_dir = static_dir
+        self.reload_interval = reload_interval
+        self.lock = threading.Lock()
+        self.assets = {}
+        self.mtimes = {}
+        self.checked_at = 0.0
+        self.reload()
+
+    def _files(self) -> list[str]:
+        try:
+            names = sorted(os.listdir(self.static_dir))
+        except OSError:
+            names = []
+        return [os.path.join(self.static_dir, name) for name in names
+                if os.path.isfile(os.path.join(self.static_dir, name))]
+
+    def _stat(self) -> dict:
+        mtimes = {}
+        for path in [self.index_path, *self._files()]:
+            try:
+                mtimes[path] = os.stat(path).st_mtime
+            except OSError:
+                pass
+        return mtimes
+
+    def reload(self):
+        mtimes = self._stat()
+        assets = {}
+        versioned = {}
+        for path in self._files():
+            name = os.path.basename(path)
+            with open(path, "rb") as f:
+                body = f.read()
+            media_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+            stem, ext = os.path.splitext(name)
+            asset = Asset(body, media_type, IMMUTABLE_CACHE_CONTROL)
+            versioned[name] = f"/static/{stem}.{asset.version}{ext}"
+            assets[versioned[name]] = asset
+            # The plain name still works (e.g. for the page opened from disk), but is revalidated
+            assets[f"/static/{name}"] = copy.copy(asset)
+            assets[f"/static/{name}"].cache_control = REVALIDATE_CACHE_CONTROL
+
+        try:
+            with open(self.index_path, encoding="utf-8", newline="") as f:
+                html = f.read()
+        except OSError as e:
+            print(f"⚠️ Could not read UI from {self.index_path}: {e}")
+            html = None
+        if html is not None:
+            for name, url in versioned.items():
+                html = re.sub(rf'(?<=["\'])/?static/{re.escape(name)}(?=["\'])', url, html)
+            assets["/"] = Asset(html.encode("utf-8"), "text/html; charset=utf-8", REVALIDATE_CACHE_CONTROL)
+
+        with self.lock:
+            self.assets = assets
+            self.mtimes = mtimes
+
+    def get(self, path: str) -> Asset | None:
+        """Asset for a URL path, checking the files' mtimes at most once per interval."""
+        now = time.monotonic()
+        if now - self.checked_at >= self.reload_interval:
+            self.checked_at = now
+            if self._stat() != self.mtimes:
+                self.reload()
+        return self.assets.get(path)
+
+    def info(self) -> dict:
+        return {
+            "encodings": list(ENCODINGS),
+            "assets": {
+                path: {"cache_control": asset.cache_control, "etag": asset.etag(None),
+                       "bytes": {encoding or "identity": len(body) for encoding, body in asset.variants.items()}}
+                for path, asset in self.assets.items()
+            },
+        }
+
+# -------------------
+# Middleware
+# -------------------
+compression_counters = {"responses": 0, "compressed": 0, "not_modified": 0, "bytes_in": 0, "bytes_out": 0}
+# finish() runs on the event loop, but may resume after a compression thread; one update per response
+compression_lock = threading.Lock()
+
+def count_compression(**deltas: int):
+    with compression_lock:
+        for name, value in deltas.items():
+            compression_counters[name] += value
+
+def compression_stats() -> dict:
+    with compression_lock:
+        counters = dict(compression_counters)
+    return {
+        "paths": COMPRESS_PATHS.pattern,
+        "encodings": list(ENCODINGS),
+        "min_bytes": COMPRESS_MIN_BYTES,
+        "max_bytes": COMPRESS_MAX_BYTES,
+        **counters,
+    }
+
+class CompressionMiddleware:
+    """
+    Pure ASGI middleware for JSON responses on COMPRESS_PATHS: adds an ETag of
+    the body (304 on If-None-Match) and compresses bodies within the size
+    thresholds. Other paths, streaming bodies past COMPRESS_MAX_BYTES and
+    non-JSON responses pass through untouched.
+    """
+
+    def __init__(self, app, paths: re.Pattern = COMPRESS_PATHS, minimum_size: int = COMPRESS_MIN_BYTES,
+                 maximum_size: int = COMPRESS_MAX_BYTES):
+        self.app = app
+        self.paths = paths
+        self.minimum_size = minimum_size
+        self.maximum_size = maximum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.paths.match(scope["path"]):
+            return await self.app(scope, receive, send)
+
+        request_headers = Headers(scope=scope)
+        encoding = pick_encoding(request_headers.get("accept-encoding", ""))
+        if_none_match = request_headers.get("if-none-match") if scope["method"] == "GET" else None
+        start = None
+        chunks = []
+        size = 0
+        passthrough = False
+
+        async def send_wrapper(message):
+            nonlocal start, size, passthrough
+            if message["type"] == "http.response.start":
+                headers = Headers(raw=message["headers"])
+                if (message["status"] != 200 or "content-encoding" in headers
+                        or not headers.get("content-type", "").startswith("application/json")):
+                    passthrough = True
+                    return await send(message)
+                start = message
+                return
+            if message["type"] != "http.response.body" or passthrough:
+                return await send(message)
+
+            chunks.append(message.get("body", b""))
+            size += len(chunks[-1])
+            more_body = message.get("more_body", False)
+            if more_body and size <= self.maximum_size:
+                return
+            if more_body:
+                # Too large to buffer: send what we have uncompressed and stream the rest
+                passthrough = True
+                await send(start)
+                return await send({"type": "http.response.body", "body": b"".join(chunks), "more_body": True})
+            await self.finish(start, b"".join(chunks), encoding, if_none_match, send)
+
+        await self.app(scope, receive, send_wrapper)
+
+    async def finish(self, start: dict, body: bytes, encoding: str | None, if_none_match: str | None, send):
+        headers = MutableHeaders(raw=list(start["headers"]))
+        digest = hashlib.sha256(body).hexdigest()[:32]
+        headers.add_vary_header("Accept-Encoding")
+        if "cache-control" not in headers:
+            headers["cache-control"] = REVALIDATE_CACHE_CONTROL
+        size_in = len(body)
+
+        if etag_matches(if_none_match, digest):
+            count_compression(responses=1, bytes_in=size_in, not_modified=1)
+            headers["etag"] = f'"{digest}-{encoding}"' if encoding else f'"{digest}"'
+            del headers["content-length"]
+            del headers["content-type"]
+            await send({**start, "status": 304, "headers": headers.raw})
+            return await send({"type": "http.response.body", "body": b""})
+
+        if encoding and self.minimum_size <= len(body) <= self.maximum_size:
+            if len(body) > COMPRESS_THREAD_BYTES:
+                body = await asyncio.to_thread(compress, body, encoding)
+            else:
+                body = compress(body, encoding)
+            headers["content-encoding"] = encoding
+            headers["etag"] = f'"{digest}-{encoding}"'
+        else:
+            headers["etag"] = f'"{digest}"'
+        headers["content-length"] = str(len(body))
+        count_compression(responses=1, bytes_in=size_in, bytes_out=len(body),
+                          compressed=int("content-encoding" in headers))
+        await send({**start, "headers": headers.raw})
+        await send({"type": "http.response.body", "body": body})
+
+asset_store = AssetStore()
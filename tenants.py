@@ -0,0 +1,270 @@
+"""
+Per-tenant knowledge bases, filter lists and routing vocabularies.
+
+A tenant is a JSON file in TENANTS_DIR named <tenant_id>.json; every section
+is optional and falls back to the built-in default configuration:
+
+    {
+      "knowledge_base": {"opening hours": "9am to 10pm"},
+      "extend_knowledge_base": false,        # true: add to the default KB instead of replacing it
+      "profanity": ["..."],
+      "ambiguous_patterns": {"tonight": ["7pm", "9pm"]},
+      "routing_rules": {"booking_query": {"patterns": ["..."]}}   # sections of routing_rules.json
+    }
+
+Requests pick a tenant with an API key (X-API-Key or "Authorization: Bearer"),
+looked up by SHA-256 in TENANT_KEYS_PATH ({"<sha256 of key>": "<tenant_id>"});
+requests without a key get the default tenant. X-Tenant-ID may only repeat
+the key's own tenant (or say "default" on a request without a key); it never
+picks a tenant by itself. Tenants are compiled on first use and kept in an LRU
+cache bounded by TENANT_CACHE_MB; the default tenant is always loaded. Tenants
+with their own routing_rules are merged over the default rules file, and are
+recompiled on next use once that file has been reloaded.
+"""
+
+import hashlib
+import json
+import os
+import re
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+from guardrails import OutputGuard
+from routing_rules import RuleSet, RoutingRulesError, get_rules, rule_store
+
+TENANTS_DIR = os.getenv("TENANTS_DIR", "tenants")
+TENANT_KEYS_PATH = os.getenv("TENANT_KEYS_PATH", os.path.join(TENANTS_DIR, "keys.json"))
+TENANT_CACHE_MB = float(os.getenv("TENANT_CACHE_MB", "64"))
+DEFAULT_TENANT = "default"
+
+TENANT_ID_RE = re.compile(r"^[a-z0-9][a-z0-9_-]{0,63}$")
+
+class TenantError(ValueError):
+    """Raised for unknown tenants or tenant files that cannot be compiled."""
+
+class InvalidAPIKeyError(TenantError):
+    """Raised when an API key does not map to any tenant, or a tenant is asked for without its key."""
+
+class InvalidThreadIdError(TenantError):
+    """Raised for client thread ids that could name another tenant's checkpoint key."""
+
+def compile_alternation(terms) -> re.Pattern | None:
+    """Case-insensitive substring matcher for a list of terms (longest first)."""
+    terms = sorted({t for t in terms if t}, key=len, reverse=True)
+    if not terms:
+        return None
+    return re.compile("|".join(re.escape(t) for t in terms), re.IGNORECASE)
+
+def approx_size(obj) -> int:
+    """Rough deep size of plain JSON-like data, for the cache budget."""
+    if isinstance(obj, dict):
+        return sys.getsizeof(obj) + sum(approx_size(k) + approx_size(v) for k, v in obj.items())
+    if isinstance(obj, (list, tuple, set, frozenset)):
+        return sys.getsizeof(obj) + sum(approx_size(v) for v in obj)
+    if isinstance(obj, re.Pattern):
+        return sys.getsizeof(obj.pattern) * 4  # compiled program is a few times the source
+    return sys.getsizeof(obj)
+
+# -------------------
+# Tenant
+# -------------------
+class Tenant:
+    """One tenant's data and the indexes compiled from it."""
+
+    def __init__(self, tenant_id: str, knowledge_base: dict, profanity: list, ambiguous_patterns: dict,
+                 rules: RuleSet | None = None, output_guard: OutputGuard | None = None,
+                 base_rules: RuleSet | None = None):
+        self.id = tenant_id
+        self.knowledge_base = dict(knowledge_base)
+        # Fast miss check; hits still scan in KB order, so the first listed key wins as before
+        self.knowledge_base_re = compile_alternation(self.knowledge_base)
+        self.profanity = list(profanity)
+        self.profanity_re = compile_alternation(self.profanity)
+        self.ambiguous_patterns = dict(ambiguous_patterns)
+        self._rules = rules
+        # The default rules custom rules were merged over; stale once the rules file reloads
+        self.base_rules = base_rules if rules is not None else None
+        self.output_guard = output_guard or OutputGuard(self.profanity)
+        self.loaded_at = time.time()
+        self.size_bytes = (
+            approx_size(self.knowledge_base) + approx_size(self.profanity) + approx_size(self.ambiguous_patterns)
+            + approx_size(self.knowledge_base_re) + approx_size(self.profanity_re)
+            + approx_size(self.output_guard.prefixes)
+        )
+
+    @property
+    def rules(self) -> RuleSet:
+        # Tenants without their own vocabulary follow the (hot-reloaded) default rules file
+        return self._rules or get_rules()
+
+    @property
+    def stale(self) -> bool:
+        return self.base_rules is not None and self.base_rules is not rule_store.rules
+
+    @property
+    def thread_prefix(self) -> str:
+        """Prefix of this tenant's checkpoint keys ("" for the default tenant's unprefixed keys)."""
+        return "" if self.id == DEFAULT_TENANT else f"{self.id}:"
+
+    def thread_id(self, thread_id: str) -> str:
+        """
+        Checkpoint key for a client thread id. Client ids may not contain ":",
+        so a key under another tenant's prefix cannot be named from here.
+        """
+        if ":" in thread_id:
+            raise InvalidThreadIdError(f"Invalid thread id {thread_id!r}: ':' is not allowed")
+        return self.thread_prefix + thread_id
+
+    def info(self) -> dict:
+        return {
+            "tenant_id": self.id,
+            "knowledge_base_entries": len(self.knowledge_base),
+            "profanity_terms": len(self.profanity),
+            "ambiguous_patterns": len(self.ambiguous_patterns),
+            "custom_rules": self._rules is not None,
+            "size_bytes": self.size_bytes,
+            "loaded_at": self.loaded_at,
+        }
+
+# -------------------
+# Registry
+# -------------------
+class TenantRegistry:
+    """Lazily loads tenants and evicts the least recently used ones over the memory budget."""
+
+    def __init__(self, default: Tenant, directory: str = TENANTS_DIR, keys_path: str = TENANT_KEYS_PATH,
+                 budget_bytes: int = int(TENANT_CACHE_MB * 1024 * 1024)):
+        self.default = default
+        self.directory = directory
+        self.keys_path = keys_path
+        self.budget_bytes = budget_bytes
+        self.lock = threading.Lock()
+        self.cache = OrderedDict()
+        self.used_bytes = 0
+        self.keys = None
+        self.counters = {"hits": 0, "misses": 0, "evictions": 0}
+
+    def get(self, tenant_id: str | None) -> Tenant:
+        if not tenant_id or tenant_id == DEFAULT_TENANT:
+            return self.default
+        get_rules()  # picks up an edited rules file, which makes tenants merged over the old one stale
+        with self.lock:
+            tenant = self.cache.get(tenant_id)
+            if tenant is not None and not tenant.stale:
+                self.cache.move_to_end(tenant_id)
+                self.counters["hits"] += 1
+                return tenant
+            self.counters["misses"] += 1
+        # Read and compile outside the lock; concurrent misses may both load, the first one is kept
+        tenant = self.load(tenant_id)
+        with self.lock:
+            cached = self.cache.get(tenant_id)
+            if cached is not None and not cached.stale:
+                self.cache.move_to_end(tenant_id)
+                return cached
+            if cached is not None:
+                del self.cache[tenant_id]
+                self.used_bytes -= cached.size_bytes
+            self.cache[tenant_id] = tenant
+            self.used_bytes += tenant.size_bytes
+            # Never evict the tenant just loaded, even if it alone is over budget
+            while self.used_bytes > self.budget_bytes and len(self.cache) > 1:
+                _, evicted = self.cache.popitem(last=False)
+                self.used_bytes -= evicted.size_bytes
+                self.counters["evictions"] += 1
+            return tenant
+
+    def load(self, tenant_id: str) -> Tenant:
+        if not TENANT_ID_RE.match(tenant_id):
+            raise TenantError(f"Invalid tenant id {tenant_id!r}")
+        path = os.path.join(self.directory, f"{tenant_id}.json")
+        try:
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            raise TenantError(f"Unknown tenant {tenant_id!r}") from None
+        except (OSError, json.JSONDecodeError) as e:
+            raise TenantError(f"Could not load tenant {tenant_id!r}: {e}") from e
+
+        default = self.default
+        knowledge_base = data.get("knowledge_base", default.knowledge_base)
+        if data.get("extend_knowledge_base") and "knowledge_base" in data:
+            knowledge_base = {**default.knowledge_base, **data["knowledge_base"]}
+
+        rules = None
+        base_rules = rule_store.rules
+        if data.get("routing_rules"):
+            try:
+                with open(rule_store.path, encoding="utf-8") as f:
+                    base_rules = json.load(f)
+                rules = RuleSet({**base_rules, **data["routing_rules"]}, source=path)
+            except (OSError, json.JSONDecodeError, RoutingRulesError) as e:
+                raise TenantError(f"Invalid routing rules for tenant {tenant_id!r}: {e}") from e
+
+        return Tenant(
+            tenant_id,
+            knowledge_base,
+            data.get("profanity", default.profanity),
+            data.get("ambiguous_patterns", default.ambiguous_patterns),
+            rules,
+            base_rules=base_rules,
+        )
+
+    def _load_keys(self) -> dict:
+        try:
+            with open(self.keys_path, encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"⚠️ Could not load tenant API keys from {self.keys_path}: {e}")
+            return {}
+
+    def reload_keys(self) -> int:
+        keys = self._load_keys()
+        with self.lock:
+            self.keys = keys
+        return len(keys)
+
+    def resolve(self, api_key: str | None = None, tenant_id: str | None = None) -> Tenant:
+        """
+        Tenant for a request: the API key's tenant, or the default one without a key.
+        A tenant id alone only selects the default tenant; any other needs its key.
+        """
+        if not api_key:
+            if tenant_id and tenant_id != DEFAULT_TENANT:
+                raise InvalidAPIKeyError(f"An API key is required for tenant {tenant_id!r}")
+            return self.default
+        if self.keys is None:
+            self.reload_keys()
+        digest = hashlib.sha256(api_key.encode("utf-8")).hexdigest()
+        key_tenant = self.keys.get(digest)
+        if key_tenant is None:
+            raise InvalidAPIKeyError("Invalid API key")
+        if tenant_id and tenant_id != key_tenant:
+            raise InvalidAPIKeyError(f"API key is not valid for tenant {tenant_id!r}")
+        return self.get(key_tenant)
+
+    def evict(self, tenant_id: str | None = None):
+        """Drop one tenant (or all) from the cache, e.g. after editing its file."""
+        with self.lock:
+            for key in ([tenant_id] if tenant_id else list(self.cache)):
+                tenant = self.cache.pop(key, None)
+                if tenant is not None:
+                    self.used_bytes -= tenant.size_bytes
+
+    def stats(self) -> dict:
+        with self.lock:
+            loaded = [tenant.info() for tenant in self.cache.values()]
+            counters = dict(self.counters)
+            used = self.used_bytes
+        return {
+            "directory": self.directory,
+            "budget_bytes": self.budget_bytes,
+            "used_bytes": used,
+            **counters,
+            "default": self.default.info(),
+            "loaded": loaded,
+        }
@@ -0,0 +1,153 @@
+from datetime import date
+
+import pytest
+
+from booking_index import add_booking, answer_query, build_index, current_index, query_range, resolve_date
+
+MONDAY = date(2026, 10, 19)
+SATURDAY = date(2026, 10, 24)
+SUNDAY = date(2026, 10, 25)
+
+def booking(day: str, party_size: str = "4", confirmed_at: str = "2026-10-19 12:00:00") -> dict:
+    return {"date": day, "party_size": party_size, "confirmed_at": confirmed_at}
+
+# -------------------
+# query_range
+# -------------------
+@pytest.mark.parametrize("message, today, expected", [
+    ("bookings this weekend", MONDAY, ("this weekend", date(2026, 10, 24), date(2026, 10, 25))),
+    ("any bookings on the weekend", MONDAY, ("this weekend", date(2026, 10, 24), date(2026, 10, 25))),
+    ("bookings this weekend", SATURDAY, ("this weekend", date(2026, 10, 24), date(2026, 10, 25))),
+    ("bookings this weekend", SUNDAY, ("this weekend", SUNDAY, SUNDAY)),
+    ("how many bookings next weekend", MONDAY, ("next weekend", date(2026, 10, 31), date(2026, 11, 1))),
+    ("how many bookings next weekend", SATURDAY, ("next weekend", date(2026, 10, 31), date(2026, 11, 1))),
+    ("how many bookings next weekend", SUNDAY, ("next weekend", date(2026, 10, 31), date(2026, 11, 1))),
+    ("bookings next week", MONDAY, ("next week", date(2026, 10, 26), date(2026, 11, 1))),
+    ("bookings next week", SUNDAY, ("next week", date(2026, 10, 26), date(2026, 11, 1))),
+    ("bookings this week", MONDAY, ("this week", MONDAY, date(2026, 10, 25))),
+    ("bookings this week", SUNDAY, ("this week", SUNDAY, SUNDAY)),
+    ("anything booked tomorrow", MONDAY, ("tomorrow", date(2026, 10, 20), date(2026, 10, 20))),
+    ("anything booked tomorrow", SUNDAY, ("tomorrow", date(2026, 10, 26), date(2026, 10, 26))),
+    ("my booking tonight", MONDAY, ("today", MONDAY, MONDAY)),
+    ("upcoming bookings", MONDAY, ("coming up", MONDAY, date.max)),
+    ("when is my next booking", MONDAY, ("coming up", MONDAY, date.max)),
+])
+def test_query_range(message, today, expected):
+    assert query_range(message, today) == expected
+
+def test_query_range_without_period():
+    assert query_range("show my bookings", MONDAY) is None
+
+# -------------------
+# resolve_date
+# -------------------
+@pytest.mark.parametrize("text, expected", [
+    # ISO
+    ("2026-11-03", date(2026, 11, 3)),
+    ("on 2027-01-15 please", date(2027, 1, 15)),
+    ("2026-02-30", None),
+    # Month/day and day/month, rolling over to next year once past
+    ("Oct 23", date(2026, 10, 23)),
+    ("October 19th", date(2026, 10, 19)),
+    ("march 5th", date(2027, 3, 5)),
+    ("23rd of October", date(2026, 10, 23)),
+    ("1 nov", date(2026, 11, 1)),
+    ("Feb 30", None),
+    # Weekdays: the next one on or after the booking day
+    ("Saturday", date(2026, 10, 24)),
+    ("Saturday evening", date(2026, 10, 24)),
+    ("monday", MONDAY),
+    ("Sunday", date(2026, 10, 25)),
+    # Relative
+    ("tomorrow", date(2026, 10, 20)),
+    ("day after tomorrow", date(2026, 10, 21)),
+    ("tonight", MONDAY),
+    # Unresolvable
+    ("sometime soon", None),
+    ("", None),
+    (None, None),
+])
+def test_resolve_date(text, expected):
+    assert resolve_date(text, MONDAY) == expected
+
+def test_resolve_date_is_relative_to_booking_day():
+    assert resolve_date("Saturday", SUNDAY) == date(2026, 10, 31)
+    assert resolve_date("tomorrow", date(2026, 12, 31)) == date(2027, 1, 1)
+
+# -------------------
+# Index
+# -------------------
+def test_add_booking_totals():
+    index = build_index([booking("Saturday", "4"), booking("2026-10-24", "2"), booking("whenever", "a few")])
+    assert index["count"] == 3
+    assert index["total_guests"] == 6
+    assert index["unsized"] == 1
+    assert index["undated"] == 1
+    assert index["by_date"] == {"2026-10-24": {"bookings": 2, "guests": 6}}
+    assert index["latest"]["resolved_date"] is None
+
+def test_add_booking_does_not_mutate():
+    index = build_index([booking("Saturday")])
+    snapshot = {**index, "by_date": dict(index["by_date"])}
+    add_booking(index, booking("Saturday"))
+    assert index == snapshot
+
+def test_current_index_rebuilds_missing_index():
+    history = [booking("Saturday", "4"), booking("tomorrow", "2")]
+    index = current_index({"booking_history": history})
+    assert index == build_index(history)
+
+def test_current_index_rebuilds_stale_index():
+    history = [booking("Saturday", "4"), booking("tomorrow", "2")]
+    stale = build_index(history[:1])
+    index = current_index({"booking_history": history, "booking_index": stale})
+    assert index["count"] == 2
+    assert index["by_date"]["2026-10-20"] == {"bookings": 1, "guests": 2}
+
+def test_current_index_keeps_fresh_index():
+    history = [booking("Saturday")]
+    fresh = build_index(history)
+    assert current_index({"booking_history": history, "booking_index": fresh}) is fresh
+
+def test_current_index_without_bookings():
+    assert current_index({})["count"] == 0
+
+# -------------------
+# answer_query
+# -------------------
+@pytest.fixture
+def index():
+    return build_index([
+        booking("Saturday", "4"),
+        booking("2026-10-31", "2"),
+        booking("November 1st", "3"),
+        booking("sometime", "5"),
+    ])
+
+def test_answer_next_weekend(index):
+    answer = answer_query(index, "How many bookings next weekend?", MONDAY)
+    assert "2 bookings next weekend (5 guests)" in answer
+    assert "Sat 31 Oct" in answer and "Sun 01 Nov" in answer
+    assert "Sat 24 Oct" not in answer
+    assert "1 booking without a specific date" in answer
+
+def test_answer_this_weekend(index):
+    answer = answer_query(index, "bookings this weekend", MONDAY)
+    assert "1 booking this weekend (4 guests)" in answer
+
+def test_answer_empty_period(index):
+    assert answer_query(index, "bookings tomorrow", MONDAY).startswith("You have no bookings tomorrow.")
+
+def test_answer_upcoming(index):
+    answer = answer_query(index, "upcoming bookings", date(2026, 10, 25))
+    assert "2 bookings coming up (5 guests)" in answer
+
+def test_answer_total_guests(index):
+    answer = answer_query(index, "total guests", MONDAY)
+    assert answer == "👥 Your 4 bookings are for 14 guests in total."
+
+def test_answer_count(index):
+    assert answer_query(index, "how many bookings do I have", MONDAY).startswith("📋 You have 4 bookings on record")
+
+def test_answer_without_bookings():
+    assert "haven't made any bookings" in answer_query(build_index([]), "bookings next week", MONDAY)
@@ -0,0 +1,32 @@
+from langchain_core.messages import AIMessage, HumanMessage
+
+from prompts import PROMPT_SUMMARY_BLOCK_CHARS, PROMPT_SUMMARY_MAX_CHARS, PromptManager, summarize_block
+
+def conversation(turns: int, length: int = 200) -> list:
+    messages = []
+    for n in range(turns):
+        messages.append(HumanMessage(content=f"question {n} " + "x" * length))
+        messages.append(AIMessage(content=f"answer {n} " + "y" * length))
+    return messages
+
+def test_summarize_block_is_bounded_and_deterministic():
+    block = conversation(10, length=1000)
+    entry = summarize_block(block)
+    assert len(entry) <= PROMPT_SUMMARY_BLOCK_CHARS
+    assert entry == summarize_block(list(block))
+    assert entry.splitlines()[0].startswith("User: question 0")
+
+def test_compact_only_appends_to_the_summary():
+    manager = PromptManager(summary_after=40, summary_block=20)
+    messages = conversation(400)
+    summary, summarized = "", 0
+    for end in range(2, len(messages) + 1, 2):
+        new_summary, summarized = manager.compact(messages[:end], summary, summarized)
+        assert new_summary.startswith(summary)
+        summary = new_summary
+    assert len(summary) <= PROMPT_SUMMARY_MAX_CHARS
+    assert len(messages) - summarized <= 40
+
+def test_compact_leaves_short_threads_alone():
+    manager = PromptManager(summary_after=40, summary_block=20)
+    assert manager.compact(conversation(10), "", 0) == ("", 0)
@@ -0,0 +1,45 @@
+import pytest
+
+from routing_rules import DEFAULT_RULES_PATH, load_rules
+
+rules = load_rules(DEFAULT_RULES_PATH)
+
+# Known messages and the route they must take with the shipped rules
+@pytest.mark.parametrize("message, in_booking_flow, route", [
+    ("How many continents are there?", False, "chat_node"),
+    ("How many people live in Tokyo?", False, "chat_node"),
+    ("What is a time slot?", False, "chat_node"),
+    ("Which slot machines pay best?", False, "chat_node"),
+    ("What's the total population of Canada?", False, "chat_node"),
+    ("How many bookings do I have?", False, "booking_query_handler"),
+    ("Show my reservations", False, "booking_query_handler"),
+    ("bookings next week", False, "booking_query_handler"),
+    ("What are my bookings this weekend?", False, "booking_query_handler"),
+    ("How many guests have I booked in total?", False, "booking_query_handler"),
+    ("total guests", False, "booking_query_handler"),
+    ("When is my next booking?", False, "booking_query_handler"),
+    ("I want to book a table", False, "booking_handler"),
+    ("yes", True, "booking_handler"),
+    ("What is the capital of France?", True, "chat_node"),
+])
+def test_messages_route_as_expected(message, in_booking_flow, route):
+    decision = rules.decide(message, in_booking_flow=in_booking_flow)
+    assert decision["route"] == route, decision
+
+@pytest.mark.parametrize("message", [
+    "How many planets are in the solar system?",
+    "how many slots does a PCI bus have",
+    "What's the total cost of a trip to Japan?",
+    "Count the vowels in banana",
+])
+def test_generic_asks_do_not_reach_booking_queries(message):
+    assert rules.decide(message)["route"] == "chat_node"
+
+@pytest.mark.parametrize("message", [
+    "how many bookings next weekend",
+    "how many reservations do I have this week",
+    "total guests booked tomorrow",
+    "What are my upcoming bookings?",
+])
+def test_booking_questions_reach_booking_queries(message):
+    assert rules.decide(message)["route"] == "booking_query_handler"
@@ -0,0 +1,455 @@
+"""
+Lightweight request tracing with OpenTelemetry-compatible spans.
+
+Each HTTP request gets a trace id (returned in the X-Trace-Id and traceparent
+headers), as does each chat turn on the WebSocket. Sampled requests record spans for the request, the graph run, every
+superstep and node, LLM and tool calls, and checkpoint reads/writes. Finished
+traces go to the configured exporters and to an in-memory ring buffer used by
+the /admin/traces endpoints.
+
+Config:
+    TRACE_EXPORTERS      comma list of "json", "otlp" (empty = local ring buffer only)
+    TRACE_SAMPLE_RATIO   share of requests to record, 0.0 - 1.0 (default 0 = off)
+    TRACE_JSON_DIR       directory for the json exporter (default "traces")
+    OTEL_EXPORTER_OTLP_ENDPOINT  base URL for the otlp exporter (default http://localhost:4318)
+    OTEL_SERVICE_NAME    service.name resource attribute (default "langgraph-chatbot")
+
+View a trace written by the json exporter:
+    python tracing.py traces/<trace_id>.json
+"""
+
+import contextvars
+import functools
+import json
+import os
+import queue
+import random
+import re
+import secrets
+import sys
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+TRACE_EXPORTERS = [e.strip() for e in os.getenv("TRACE_EXPORTERS", "").split(",") if e.strip()]
+TRACE_SAMPLE_RATIO = float(os.getenv("TRACE_SAMPLE_RATIO", "0"))
+TRACE_JSON_DIR = os.getenv("TRACE_JSON_DIR", "traces")
+OTLP_ENDPOINT = os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT", "http://localhost:4318")
+SERVICE_NAME = os.getenv("OTEL_SERVICE_NAME", "langgraph-chatbot")
+RECENT_TRACES = 100
+
+TRACEPARENT_RE = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+
+# -------------------
+# Spans & traces
+# -------------------
+class Span:
+    __slots__ = ("trace", "span_id", "parent_id", "name", "kind", "start_ns", "end_ns", "attributes", "status")
+
+    def __init__(self, trace, name: str, parent_id: str | None, kind: str = "internal", attributes: dict | None = None):
+        self.trace = trace
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.name = name
+        self.kind = kind
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self.attributes = attributes or {}
+        self.status = "ok"
+
+    def end(self, error: BaseException | None = None):
+        if self.end_ns is not None:
+            return
+        if error is not None:
+            self.status = "error"
+            self.attributes["exception.type"] = type(error).__name__
+            self.attributes["exception.message"] = str(error)
+        self.end_ns = time.time_ns()
+        self.trace.finished(self)
+
+    def to_dict(self) -> dict:
+        return {
+            "trace_id": self.trace.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "kind": self.kind,
+            "start_ns": self.start_ns,
+            "end_ns": self.end_ns,
+            "duration_ms": round((self.end_ns - self.start_ns) / 1e6, 3) if self.end_ns else None,
+            "attributes": self.attributes,
+            "status": self.status,
+        }
+
+class Trace:
+    """All spans of one request. Only sampled traces record anything."""
+
+    def __init__(self, trace_id: str | None = None, sampled: bool = False):
+        self.trace_id = trace_id or secrets.token_hex(16)
+        self.sampled = sampled
+        self.spans = []
+        self.lock = threading.Lock()
+
+    def start_span(self, name: str, parent_id: str | None = None, kind: str = "internal", attributes: dict | None = None) -> Span:
+        return Span(self, name, parent_id, kind, attributes)
+
+    def finished(self, span: Span):
+        with self.lock:
+            self.spans.append(span)
+
+    def to_dict(self) -> dict:
+        with self.lock:
+            spans = sorted((s.to_dict() for s in self.spans), key=lambda s: s["start_ns"])
+        return {"trace_id": self.trace_id, "spans": spans}
+
+# The trace and the innermost span of the current request
+_current = contextvars.ContextVar("current_trace", default=(None, None))
+
+def current_trace() -> Trace | None:
+    return _current.get()[0]
+
+@contextmanager
+def span(name: str, kind: str = "internal", **attributes):
+    """Record a child span of the current span, if the request is sampled."""
+    trace, parent = _current.get()
+    if trace is None or not trace.sampled:
+        yield None
+        return
+    s = trace.start_span(name, parent.span_id if parent else None, kind, attributes)
+    token = _current.set((trace, s))
+    try:
+        yield s
+    except BaseException as e:
+        s.end(error=e)
+        raise
+    finally:
+        _current.reset(token)
+        s.end()
+
+# -------------------
+# Exporters
+# -------------------
+class JsonFileExporter:
+    """One JSON file per trace, for offline analysis."""
+
+    def __init__(self, directory: str = TRACE_JSON_DIR):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def export(self, trace_data: dict):
+        path = os.path.join(self.directory, f"{trace_data['trace_id']}.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(trace_data, f)
+
+class OtlpHttpExporter:
+    """OTLP/HTTP JSON exporter; sends from a background thread so requests never wait on it."""
+
+    KINDS = {"internal": 1, "server": 2, "client": 3}
+
+    def __init__(self, endpoint: str = OTLP_ENDPOINT, service_name: str = SERVICE_NAME):
+        self.url = endpoint.rstrip("/") + "/v1/traces"
+        self.service_name = service_name
+        self.queue = queue.Queue(maxsize=1000)
+        threading.Thread(target=self._worker, name="otlp-exporter", daemon=True).start()
+
+    def export(self, trace_data: dict):
+        try:
+            self.queue.put_nowait(trace_data)
+        except queue.Full:
+            pass  # drop rather than block requests
+
+    @staticmethod
+    def _value(value) -> dict:
+        if isinstance(value, bool):
+            return {"boolValue": value}
+        if isinstance(value, int):
+            return {"intValue": str(value)}
+        if isinstance(value, float):
+            return {"doubleValue": value}
+        return {"stringValue": str(value)}
+
+    def _payload(self, trace_data: dict) -> dict:
+        spans = [{
+            "traceId": s["trace_id"],
+            "spanId": s["span_id"],
+            **({"parentSpanId": s["parent_id"]} if s["parent_id"] else {}),
+            "name": s["name"],
+            "kind": self.KINDS.get(s["kind"], 1),
+            "startTimeUnixNano": str(s["start_ns"]),
+            "endTimeUnixNano": str(s["end_ns"]),
+            "attributes": [{"key": k, "value": self._value(v)} for k, v in s["attributes"].items()],
+            "status": {"code": 2 if s["status"] == "error" else 1},
+        } for s in trace_data["spans"]]
+        return {"resourceSpans": [{
+            "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": self.service_name}}]},
+            "scopeSpans": [{"scope": {"name": "tracing"}, "spans": spans}],
+        }]}
+
+    def _worker(self):
+        import requests
+
+        while True:
+            trace_data = self.queue.get()
+            try:
+                requests.post(self.url, json=self._payload(trace_data), timeout=5)
+            except Exception as e:
+                print(f"⚠️ OTLP export failed: {e}")
+
+EXPORTER_TYPES = {"json": JsonFileExporter, "otlp": OtlpHttpExporter}
+
+class Tracer:
+    def __init__(self, sample_ratio: float = TRACE_SAMPLE_RATIO, exporters: list | None = None):
+        self.sample_ratio = sample_ratio
+        self.exporters = [EXPORTER_TYPES[name]() for name in (TRACE_EXPORTERS if exporters is None else exporters)]
+        self.recent = OrderedDict()
+        self.lock = threading.Lock()
+
+    def new_trace(self, traceparent: str | None = None) -> Trace:
+        """Continue an incoming W3C traceparent if there is one, otherwise sample by ratio."""
+        match = TRACEPARENT_RE.match(traceparent or "")
+        if match:
+            return Trace(match.group(1), sampled=bool(int(match.group(3), 16) & 1))
+        return Trace(sampled=self.sample_ratio > 0 and random.random() < self.sample_ratio)
+
+    def export(self, trace: Trace):
+        trace_data = trace.to_dict()
+        with self.lock:
+            self.recent[trace.trace_id] = trace_data
+            while len(self.recent) > RECENT_TRACES:
+                self.recent.popitem(last=False)
+        for exporter in self.exporters:
+            try:
+                exporter.export(trace_data)
+            except Exception as e:
+                print(f"⚠️ Trace export failed: {e}")
+
+    def get(self, trace_id: str) -> dict | None:
+        with self.lock:
+            return self.recent.get(trace_id)
+
+    def list_recent(self) -> list:
+        with self.lock:
+            traces = list(self.recent.values())
+        return [{
+            "trace_id": t["trace_id"],
+            "name": t["spans"][0]["name"] if t["spans"] else None,
+            "duration_ms": max((s["duration_ms"] or 0) for s in t["spans"]) if t["spans"] else 0,
+            "span_count": len(t["spans"]),
+        } for t in reversed(traces)]
+
+tracer = Tracer()
+
+@contextmanager
+def request_trace(name: str, traceparent: str | None = None, attributes: dict | None = None):
+    """
+    Start a trace with a server span as the current one, and export it when the
+    block exits. Used per HTTP request, and per turn on a WebSocket, which
+    carries many turns and never reaches the HTTP middleware.
+    """
+    trace = tracer.new_trace(traceparent)
+    root = trace.start_span(name, kind="server", attributes=attributes)
+    token = _current.set((trace, root))
+    error = None
+    try:
+        yield trace, root
+    except BaseException as e:
+        error = e
+        raise
+    finally:
+        _current.reset(token)
+        if trace.sampled:
+            root.end(error=error)
+            tracer.export(trace)
+
+# -------------------
+# HTTP middleware
+# -------------------
+class TracingMiddleware:
+    """
+    Pure ASGI middleware, so the request span stays open until a streamed
+    body has been fully sent rather than ending when the headers go out.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        headers = dict(scope.get("headers") or [])
+        with request_trace(
+            f"{scope['method']} {scope['path']}", headers.get(b"traceparent", b"").decode("latin-1"),
+            {"http.method": scope["method"], "http.target": scope["path"]}
+        ) as (trace, request_span):
+
+            async def send_wrapper(message):
+                if message["type"] == "http.response.start":
+                    request_span.attributes["http.status_code"] = message["status"]
+                    message.setdefault("headers", [])
+                    message["headers"] = list(message["headers"]) + [
+                        (b"x-trace-id", trace.trace_id.encode()),
+                        (b"traceparent", f"00-{trace.trace_id}-{request_span.span_id}-{'01' if trace.sampled else '00'}".encode()),
+                    ]
+                await send(message)
+
+            await self.app(scope, receive, send_wrapper)
+
+# -------------------
+# Graph, LLM & tool spans
+# -------------------
+class GraphTracingHandler(BaseCallbackHandler):
+    """Turns LangChain/LangGraph callbacks into graph, superstep, node, LLM and tool spans."""
+
+    def __init__(self, trace: Trace, parent: Span | None):
+        self.trace = trace
+        self.parent_id = parent.span_id if parent else None
+        self.runs = {}
+        self.steps = {}
+        self.graph_run_id = None
+
+    def _start(self, run_id, parent_run_id, name: str, kind: str = "internal", attributes: dict | None = None):
+        parent = self.runs.get(parent_run_id)
+        parent_id = parent.span_id if parent else self.parent_id
+        self.runs[run_id] = self.trace.start_span(name, parent_id, kind, attributes)
+
+    def _end(self, run_id, error=None, attributes: dict | None = None):
+        s = self.runs.pop(run_id, None)
+        if s is None:
+            return
+        if attributes:
+            s.attributes.update(attributes)
+        s.end(error=error)
+        step = self.steps.get(s.attributes.get("langgraph.step"))
+        if step is not None:
+            step.end_ns = max(step.end_ns or 0, s.end_ns)
+
+    def on_chain_start(self, serialized, inputs, *, run_id, parent_run_id=None, tags=None, metadata=None, **kwargs):
+        name = kwargs.get("name") or (serialized or {}).get("name") or "chain"
+        metadata = metadata or {}
+        if parent_run_id is None:
+            self._start(run_id, parent_run_id, f"graph {name}")
+            self.graph_run_id = run_id
+            return
+
+        step = metadata.get("langgraph_step")
+        if parent_run_id == self.graph_run_id and step is not None:
+            # Group the nodes of each superstep under one span
+            if step not in self.steps:
+                step_span = self.trace.start_span(f"superstep {step}", self.runs[self.graph_run_id].span_id)
+                step_span.attributes["langgraph.step"] = step
+                self.steps[step] = step_span
+            self.runs[run_id] = self.trace.start_span(
+                f"node {metadata.get('langgraph_node', name)}", self.steps[step].span_id,
+                attributes={"langgraph.node": metadata.get("langgraph_node", name), "langgraph.step": step}
+            )
+            return
+
+        self._start(run_id, parent_run_id, name)
+
+    def on_chain_end(self, outputs, *, run_id, **kwargs):
+        self._end(run_id)
+        if run_id == self.graph_run_id:
+            for step_span in self.steps.values():
+                step_span.end_ns = step_span.end_ns or time.time_ns()
+                self.trace.finished(step_span)
+            self.steps.clear()
+
+    def on_chain_error(self, error, *, run_id, **kwargs):
+        self._end(run_id, error=error)
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, parent_run_id=None, metadata=None, **kwargs):
+        model = (metadata or {}).get("ls_model_name") or kwargs.get("name") or "llm"
+        self._start(run_id, parent_run_id, f"llm {model}", kind="client",
+                    attributes={"llm.model": model, "llm.message_count": sum(len(m) for m in messages)})
+
+    def on_llm_start(self, serialized, prompts, *, run_id, parent_run_id=None, metadata=None, **kwargs):
+        model = (metadata or {}).get("ls_model_name") or kwargs.get("name") or "llm"
+        self._start(run_id, parent_run_id, f"llm {model}", kind="client", attributes={"llm.model": model})
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        usage = (response.llm_output or {}).get("token_usage") or {}
+        attributes = {
+            f"llm.usage.{key}": value for key, value in usage.items() if isinstance(value, (int, float))
+        }
+        generation = response.generations[0][0] if response.generations and response.generations[0] else None
+        usage_metadata = getattr(getattr(generation, "message", None), "usage_metadata", None)
+        if usage_metadata:
+            attributes["llm.usage.prompt_tokens"] = usage_metadata.get("input_tokens", 0)
+            attributes["llm.usage.cached_tokens"] = (usage_metadata.get("input_token_details") or {}).get("cache_read", 0)
+        self._end(run_id, attributes=attributes)
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._end(run_id, error=error)
+
+    def on_tool_start(self, serialized, input_str, *, run_id, parent_run_id=None, **kwargs):
+        name = kwargs.get("name") or (serialized or {}).get("name") or "tool"
+        self._start(run_id, parent_run_id, f"tool {name}", kind="client", attributes={"tool.name": name})
+
+    def on_tool_end(self, output, *, run_id, **kwargs):
+        self._end(run_id)
+
+    def on_tool_error(self, error, *, run_id, **kwargs):
+        self._end(run_id, error=error)
+
+def traced_config(config: dict) -> dict:
+    """Attach a span-recording callback handler to a graph config for sampled requests."""
+    trace, parent = _current.get()
+    if trace is None or not trace.sampled:
+        return config
+    return {**config, "callbacks": [*config.get("callbacks", []), GraphTracingHandler(trace, parent)]}
+
+# -------------------
+# Checkpointer spans
+# -------------------
+def instrument_checkpointer(checkpointer):
+    """Wrap a checkpointer's sync read/write methods in spans. Returns the same object."""
+    for method in ("get_tuple", "put", "put_writes"):
+        original = getattr(checkpointer, method)
+
+        @functools.wraps(original)
+        def wrapper(*args, _original=original, _method=method, **kwargs):
+            with span(f"checkpoint {_method}", kind="client", **{"db.system": "sqlite"}):
+                return _original(*args, **kwargs)
+
+        setattr(checkpointer, method, wrapper)
+    return checkpointer
+
+# -------------------
+# Viewer
+# -------------------
+def render_waterfall(trace_data: dict, width: int = 40) -> str:
+    """Render a trace as an indented text waterfall."""
+    spans = trace_data["spans"]
+    if not spans:
+        return f"trace {trace_data['trace_id']}: no spans"
+    start = min(s["start_ns"] for s in spans)
+    total = max(s["end_ns"] for s in spans) - start or 1
+    children = {}
+    for s in spans:
+        children.setdefault(s["parent_id"], []).append(s)
+    ids = {s["span_id"] for s in spans}
+
+    lines = [f"trace {trace_data['trace_id']}  {total / 1e6:.1f} ms"]
+
+    def walk(s, depth):
+        offset = int((s["start_ns"] - start) / total * width)
+        length = max(1, int((s["end_ns"] - s["start_ns"]) / total * width))
+        bar = " " * offset + "█" * length
+        marker = " !" if s["status"] == "error" else ""
+        lines.append(f"{bar:<{width + 1}} {s['duration_ms']:9.2f} ms  {'  ' * depth}{s['name']}{marker}")
+        for child in sorted(children.get(s["span_id"], []), key=lambda c: c["start_ns"]):
+            walk(child, depth + 1)
+
+    for root in sorted((s for s in spans if s["parent_id"] not in ids), key=lambda c: c["start_ns"]):
+        walk(root, 0)
+    return "\n".join(lines)
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        sys.exit("usage: python tracing.py <trace.json>")
+    with open(sys.argv[1], encoding="utf-8") as f:
+        print(render_waterfall(json.load(f)))